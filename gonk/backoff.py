@@ -0,0 +1,29 @@
+import random
+from datetime import timedelta
+from typing import Optional
+
+from gonk.settings import RetryBackoffChoices
+
+
+def get_delay(strategy: str,
+              base: timedelta,
+              retries: int,
+              cap: timedelta,
+              previous: Optional[timedelta] = None) -> timedelta:
+    """
+    Delay before the next retry of a task that has been retried `retries` times.
+    - fixed: always `base`.
+    - exponential: `base` doubled on every retry.
+    - decorrelated jitter: random between `base` and three times the `previous` delay, so tasks
+      that failed together spread their retries instead of hitting the dependency again at once.
+    Every delay is limited by `cap`.
+    """
+    if strategy == RetryBackoffChoices.EXPONENTIAL:
+        delay = base * 2 ** min(retries, 20)
+    elif strategy == RetryBackoffChoices.JITTER:
+        upper = (previous or base) * 3
+        delay = timedelta(seconds=random.uniform(base.total_seconds(), upper.total_seconds()))
+    else:
+        delay = base
+
+    return min(delay, cap)
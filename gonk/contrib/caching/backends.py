@@ -0,0 +1,140 @@
+import copy
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Optional
+
+from gonk.contrib.caching import settings
+
+MISSING = object()
+
+
+class CacheStats:
+    """
+    Counters of a result cache. They are cumulative for the life of the process.
+    """
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+
+    def as_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+class BaseResultCache:
+    def __init__(self):
+        self.stats = CacheStats()
+
+    def get(self, key: str):
+        """
+        Returns the cached results of `key` or `MISSING`.
+        """
+        raise NotImplementedError()
+
+    def set(self, key: str, results: dict, ttl: Optional[float] = None):
+        raise NotImplementedError()
+
+    def get_stats(self) -> dict:
+        return self.stats.as_dict()
+
+
+class LocalResultCache(BaseResultCache):
+    """
+    In-process LRU cache. Entries expire after their TTL and the least recently used one
+    is evicted when `max_size` is reached. Results are copied in and out, so runners
+    mutating `task.results` never change a cached value.
+    """
+    def __init__(self, max_size: int = settings.RESULT_CACHE_SIZE, ttl: float = settings.RESULT_CACHE_TTL):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str):
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is not None and entry[1] is not None and entry[1] <= monotonic():
+                del self.entries[key]
+                self.stats.evictions += 1
+                entry = None
+
+            if entry is None:
+                self.stats.misses += 1
+                return MISSING
+
+            self.entries.move_to_end(key)
+            self.stats.hits += 1
+            return copy.deepcopy(entry[0])
+
+    def set(self, key: str, results: dict, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = monotonic() + ttl if ttl else None
+
+        with self.lock:
+            self.entries[key] = (copy.deepcopy(results), expires)
+            self.entries.move_to_end(key)
+            self.stats.sets += 1
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class DjangoResultCache(BaseResultCache):
+    """
+    Stores results in a Django cache, shared by every worker. Eviction is left to the cache backend.
+    """
+    def __init__(self, alias: str = 'default', ttl: float = settings.RESULT_CACHE_TTL):
+        super().__init__()
+        self.alias = alias
+        self.ttl = ttl
+
+    @property
+    def cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    def get(self, key: str):
+        results = self.cache.get(key, MISSING)
+
+        if results is MISSING:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+
+        return results
+
+    def set(self, key: str, results: dict, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        # 0 keeps the results until evicted, for Django it would expire them right away
+        self.cache.set(key, results, ttl or None)
+        self.stats.sets += 1
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> BaseResultCache:
+    """
+    Returns the process wide cache set up by `GONK_RESULT_CACHE`: `local` for an in-process LRU cache
+    or the alias of a Django cache.
+    """
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            if settings.RESULT_CACHE == 'local':
+                _cache = LocalResultCache()
+            else:
+                _cache = DjangoResultCache(settings.RESULT_CACHE)
+
+        return _cache
@@ -0,0 +1,31 @@
+from typing import Optional
+
+from gonk.contrib.caching.backends import MISSING, BaseResultCache, get_result_cache
+
+
+class CachedResultMixin:
+    """
+    Memoizes the results of runners that are pure functions of `task.input`.
+    Before running, the results of an identical input are looked up in the cache and, when found,
+    copied into the task, which is then done without running. Runs that raise are never cached.
+    """
+    result_cache: Optional[BaseResultCache] = None
+    result_cache_ttl: Optional[float] = None
+
+    def get_result_cache(self) -> BaseResultCache:
+        return self.result_cache or get_result_cache()
+
+    def get_cache_key(self) -> str:
+        return f'gonk:results:{self.task.hash_input(self.task.runner_path, self.task.input)}'
+
+    def run(self):
+        cache = self.get_result_cache()
+        key = self.get_cache_key()
+        results = cache.get(key)
+
+        if results is not MISSING:
+            self.task.results = results
+            return
+
+        super().run()
+        cache.set(key, self.task.results, self.result_cache_ttl)
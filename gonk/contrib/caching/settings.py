@@ -0,0 +1,6 @@
+from django.conf import settings
+
+
+RESULT_CACHE = getattr(settings, 'GONK_RESULT_CACHE', 'local')
+RESULT_CACHE_TTL = getattr(settings, 'GONK_RESULT_CACHE_TTL', 300)
+RESULT_CACHE_SIZE = getattr(settings, 'GONK_RESULT_CACHE_SIZE', 1024)
@@ -1,8 +1,7 @@
-from threading import Thread
-
 import jwt
 import requests
 from gonk.contrib.notifications import settings
+from gonk.contrib.notifications.publisher import get_publisher
 
 
 def make_request(headers, data):
@@ -19,27 +18,12 @@ def publish_event(topic: str, targets: list, data: str) -> 'requests.Response':
     topic: The topic the event will be sent to. Only subscribers who request this topic will get notified.
     targets: The targets that are eligible to get the event.
     data: The data to publish
+    The request reuses the keep-alive connections and cached JWT tokens of the process publisher.
     """
-    token = get_jwt_token([], targets)
-    headers = {
-        'Authorization': 'Bearer {}'.format(token),
-        'Content-Type': 'application/x-www-form-urlencoded',
-    }
-
-    data = {
-        'topic': topic,
-        'data': data,
-        'private': 'on'
-    }
-
-    return requests.post(
-        settings.MERCURE_HUB_URL,
-        data=data,
-        headers=headers,
-    )
+    return get_publisher().send(topic, targets, data)
 
 
-def get_jwt_token(subscribe_targets: list, publish_targets: list) -> str:
+def get_jwt_token(subscribe_targets: list, publish_targets: list, key: str = None) -> str:
     """
     Creates a Mercure JWT token with the subscribe and publish targets.
     The JWT token gets signed with a key shared with the Mercure Hub.
@@ -51,11 +35,11 @@ def get_jwt_token(subscribe_targets: list, publish_targets: list) -> str:
                 'publish': publish_targets
             }
         },
-        settings.MERCURE_JWT_KEY,
+        key if key is not None else settings.MERCURE_JWT_KEY,
         algorithm='HS256'
     )
     # Depends of the version, jwt can respond with bytes or str
-    return token.decode('utf-8') if getattr(token, 'decode') else token
+    return token.decode('utf-8') if getattr(token, 'decode', None) else token
 
 
 class MercureNotificationMixin:
@@ -71,7 +55,6 @@ class MercureNotificationMixin:
             username = self.get_username()
             topic = self.get_topic_name()
 
-            t = Thread(target=publish_event, args=(topic, [topic, username], data))
-            t.start()
+            get_publisher().publish(topic, [topic, username], data)
 
         super(MercureNotificationMixin, self).notify(data)
@@ -0,0 +1,258 @@
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict
+from time import monotonic, sleep
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from gonk.contrib.notifications import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PublisherStats:
+    """
+    Backpressure metrics of a publisher. Counters are cumulative for the life of the process.
+    """
+    def __init__(self):
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.rate_limited = 0
+        self.published = 0
+        self.failed = 0
+        self.max_backlog = 0
+
+    def as_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+class MercurePublisher:
+    """
+    Publishes events to the Mercure Hub from a small pool of worker threads.
+    Events wait in a bounded backlog and are sent through a keep-alive `requests.Session`.
+    An event published while a previous one for the same topic is still waiting replaces it,
+    so bursts are coalesced and only the latest data of every topic is sent.
+    When the backlog is full new topics are dropped instead of blocking the caller.
+
+    With a `batch_window` (milliseconds) events are gathered and released to the workers once per window.
+    A topic is released at most `topic_rate_limit` times per second; while it is held back only its latest
+    event is kept, so a progress event never waits behind stale ones.
+    """
+    def __init__(self,
+                 hub_url: str,
+                 jwt_key: str,
+                 workers: int = settings.MERCURE_PUBLISHER_WORKERS,
+                 queue_size: int = settings.MERCURE_PUBLISHER_QUEUE_SIZE,
+                 jwt_ttl: float = settings.MERCURE_JWT_TTL,
+                 jwt_cache_size: int = settings.MERCURE_JWT_CACHE_SIZE,
+                 timeout: float = settings.MERCURE_TIMEOUT,
+                 batch_window: float = settings.MERCURE_BATCH_WINDOW,
+                 topic_rate_limit: float = settings.MERCURE_TOPIC_RATE_LIMIT):
+        self.hub_url = hub_url
+        self.jwt_key = jwt_key
+        self.workers = workers
+        self.queue_size = queue_size
+        self.jwt_ttl = jwt_ttl
+        self.jwt_cache_size = jwt_cache_size
+        self.timeout = timeout
+        self.batch_window = batch_window / 1000
+        self.min_interval = 1 / topic_rate_limit if topic_rate_limit else 0
+        self.pid = os.getpid()
+        self.stats = PublisherStats()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.queue = queue.Queue()
+        self.pending = {}
+        self.released = set()
+        self.last_sent = {}
+        # Signed tokens by target set, oldest first so expired ones are evicted from the front
+        self.tokens = OrderedDict()
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.threads = []
+        self.batcher = None
+
+    def start(self):
+        with self.lock:
+            if self.threads:
+                return
+
+            for i in range(self.workers):
+                thread = threading.Thread(target=self.work, name=f'gonk-mercure-{i}', daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+            if self.batch_window:
+                self.batcher = threading.Thread(target=self.batch, name='gonk-mercure-batcher', daemon=True)
+                self.batcher.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.batcher:
+            self.batcher.join()
+
+        for _ in self.threads:
+            self.queue.put(None)
+
+        for thread in self.threads:
+            thread.join()
+
+        self.threads = []
+        self.session.close()
+
+    def flush(self):
+        """
+        Blocks until every pending event has been sent.
+        """
+        while True:
+            self.queue.join()
+
+            with self.lock:
+                if not self.pending:
+                    return
+
+            sleep(self.batch_window or 0.001)
+
+    def publish(self, topic: str, targets: list, data: str) -> bool:
+        """
+        Queues an event without blocking. Returns False when the event was dropped because the backlog is full.
+        """
+        self.start()
+
+        with self.lock:
+            if topic in self.pending:
+                self.pending[topic] = (targets, data)
+                self.stats.coalesced += 1
+                return True
+
+            if len(self.pending) >= self.queue_size:
+                self.stats.dropped += 1
+                return False
+
+            self.pending[topic] = (targets, data)
+            self.stats.enqueued += 1
+            self.stats.max_backlog = max(self.stats.max_backlog, len(self.pending))
+
+            if not self.batch_window:
+                self.queue.put(topic)
+
+        return True
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return dict(self.stats.as_dict(), backlog=len(self.pending))
+
+    def batch(self):
+        while not self.stopping.wait(self.batch_window):
+            self.release()
+
+    def release(self):
+        """
+        Hands every pending topic that is not rate limited over to the workers.
+        """
+        now = monotonic()
+
+        with self.lock:
+            for topic in self.pending:
+                if topic in self.released:
+                    continue
+
+                if now < self.last_sent.get(topic, 0) + self.min_interval:
+                    self.stats.rate_limited += 1
+                    continue
+
+                self.released.add(topic)
+                self.queue.put(topic)
+
+            if self.min_interval:
+                self.last_sent = {
+                    topic: sent for topic, sent in self.last_sent.items() if now < sent + self.min_interval
+                }
+
+    def work(self):
+        while True:
+            topic = self.queue.get()
+
+            try:
+                if topic is None:
+                    return
+
+                with self.lock:
+                    targets, data = self.pending.pop(topic)
+                    self.released.discard(topic)
+                    if self.min_interval:
+                        self.last_sent[topic] = monotonic()
+
+                self.send(topic, targets, data).raise_for_status()
+                with self.lock:
+                    self.stats.published += 1
+            except Exception as e:
+                with self.lock:
+                    self.stats.failed += 1
+                logger.warning(f'Could not publish Mercure event: {str(e)}')
+            finally:
+                self.queue.task_done()
+
+    def get_token(self, targets: list) -> str:
+        from gonk.contrib.notifications.mercure import get_jwt_token
+
+        key = frozenset(targets)
+        now = monotonic()
+
+        with self.lock:
+            while self.tokens and next(iter(self.tokens.values()))[1] <= now:
+                self.tokens.popitem(last=False)
+
+            cached = self.tokens.get(key)
+            if cached:
+                return cached[0]
+
+        token = get_jwt_token([], targets, key=self.jwt_key)
+
+        with self.lock:
+            self.tokens.pop(key, None)
+            self.tokens[key] = (token, now + self.jwt_ttl)
+            while len(self.tokens) > self.jwt_cache_size:
+                self.tokens.popitem(last=False)
+
+        return token
+
+    def send(self, topic: str, targets: list, data: str) -> 'requests.Response':
+        headers = {
+            'Authorization': 'Bearer {}'.format(self.get_token(targets)),
+            'Content-Type': 'application/x-www-form-urlencoded',
+        }
+
+        data = {
+            'topic': topic,
+            'data': data,
+            'private': 'on'
+        }
+
+        return self.session.post(self.hub_url, data=data, headers=headers, timeout=self.timeout)
+
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+
+def get_publisher() -> MercurePublisher:
+    """
+    Returns the publisher of the current process. A new one is created after a fork,
+    since the worker threads of the parent process do not survive it.
+    """
+    global _publisher
+
+    with _publisher_lock:
+        if _publisher is None or _publisher.pid != os.getpid():
+            _publisher = MercurePublisher(settings.MERCURE_HUB_URL, settings.MERCURE_JWT_KEY)
+
+        return _publisher
@@ -3,5 +3,12 @@ from django.conf import settings
 
 MERCURE_HUB_URL = getattr(settings, 'MERCURE_HUB_URL', '')
 MERCURE_JWT_KEY = getattr(settings, 'MERCURE_JWT_KEY', '')
+MERCURE_JWT_TTL = getattr(settings, 'MERCURE_JWT_TTL', 300)
+MERCURE_JWT_CACHE_SIZE = getattr(settings, 'MERCURE_JWT_CACHE_SIZE', 1000)
+MERCURE_TIMEOUT = getattr(settings, 'MERCURE_TIMEOUT', 5)
+MERCURE_PUBLISHER_WORKERS = getattr(settings, 'MERCURE_PUBLISHER_WORKERS', 2)
+MERCURE_PUBLISHER_QUEUE_SIZE = getattr(settings, 'MERCURE_PUBLISHER_QUEUE_SIZE', 1000)
+MERCURE_BATCH_WINDOW = getattr(settings, 'MERCURE_BATCH_WINDOW', 0)
+MERCURE_TOPIC_RATE_LIMIT = getattr(settings, 'MERCURE_TOPIC_RATE_LIMIT', 0)
 
 DEFAULT_NOTIFICATION_EMAIL = getattr(settings, 'DEFAULT_NOTIFICATION_EMAIL', '')
@@ -0,0 +1,9 @@
+from rest_framework.routers import DefaultRouter
+
+from gonk.contrib.rest_framework.viewsets import AsyncTaskViewSet
+
+router = DefaultRouter(trailing_slash=True)
+
+router.register(r'', AsyncTaskViewSet, basename='async')
+
+urlpatterns = router.urls
@@ -0,0 +1,27 @@
+from rest_framework.filters import BaseFilterBackend
+
+from gonk.registry import REGISTRY
+
+
+class TaskFilterBackend(BaseFilterBackend):
+    """
+    Filters tasks by `status`, `queue` and `task_type`. Every parameter accepts comma separated values.
+    """
+    def get_values(self, request, param):
+        value = request.query_params.get(param)
+        return [v for v in value.split(',') if v] if value else []
+
+    def filter_queryset(self, request, queryset, view):
+        statuses = self.get_values(request, 'status')
+        if statuses:
+            queryset = queryset.filter(status__in=statuses)
+
+        queues = self.get_values(request, 'queue')
+        if queues:
+            queryset = queryset.filter(queue__in=queues)
+
+        task_types = self.get_values(request, 'task_type')
+        if task_types:
+            queryset = queryset.filter(runner_path__in=[REGISTRY.registry.get(t) for t in task_types])
+
+        return queryset
@@ -0,0 +1,17 @@
+from rest_framework.pagination import CursorPagination
+from rest_framework.settings import api_settings
+
+from gonk.settings import LOG_PAGE_SIZE, TASK_PAGE_SIZE
+
+
+class TaskCursorPagination(CursorPagination):
+    page_size = TASK_PAGE_SIZE or api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = ('-created', '-id')
+
+
+class TaskLogCursorPagination(CursorPagination):
+    page_size = LOG_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    ordering = 'id'
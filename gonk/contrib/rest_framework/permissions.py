@@ -7,11 +7,17 @@ class CanCreateTaskPermission(BasePermission):
 
 
 class CanCancelTaskPermission(BasePermission):
+    def has_permission(self, request, view):
+        return request.user.is_superuser or request.user.has_perm('gonk.can_cancel_task')
+
     def has_object_permission(self, request, view, obj):
         return request.user.is_superuser or request.user.has_perm('gonk.can_cancel_task') and request.user.username == obj.username
 
 
 class CanRevertTaskPermission(BasePermission):
+    def has_permission(self, request, view):
+        return request.user.is_superuser or request.user.has_perm('gonk.can_revert_task')
+
     def has_object_permission(self, request, view, obj):
         if not obj.get_taskrunner().reversible:
             return False
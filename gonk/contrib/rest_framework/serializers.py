@@ -4,8 +4,9 @@ from rest_framework.exceptions import ValidationError
 
 from django.utils.text import gettext_lazy as _
 
-from gonk.models import Task
+from gonk.models import Task, TaskLogEntry
 from gonk.registry import REGISTRY
+from gonk.settings import RetryBackoffChoices, LOG_TAIL_SIZE, WAIT_TIMEOUT
 
 
 class TaskSerializer(serializers.ModelSerializer):
@@ -18,10 +19,20 @@ class TaskSerializer(serializers.ModelSerializer):
             'revert_started_on',
             'revert_finished_on',
             'status',
+            'parent',
         )
 
 
 class RetrieveTaskSerializer(TaskSerializer):
+    log = serializers.SerializerMethodField()
+
+    def get_log(self, obj):
+        """
+        Only the last `GONK_LOG_TAIL_SIZE` entries; the whole log is paginated by the `logs` endpoint.
+        """
+        tail = reversed(obj.log_entries.order_by('-id')[:LOG_TAIL_SIZE])
+        return obj.log + ''.join(str(entry) for entry in tail)
+
     class Meta:
         model = Task
         fields = TaskSerializer.Meta.fields + (
@@ -30,14 +41,69 @@ class RetrieveTaskSerializer(TaskSerializer):
         )
 
 
+class TaskLogEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TaskLogEntry
+        fields = (
+            'id',
+            'created',
+            'level',
+            'message',
+            'status',
+        )
+
+
+class TaskProgressSerializer(serializers.Serializer):
+    total = serializers.IntegerField()
+    done = serializers.IntegerField()
+    pending = serializers.IntegerField()
+    failed = serializers.IntegerField()
+
+
+class TaskChangeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Task
+        fields = (
+            'id',
+            'status',
+            'modified',
+        )
+
+
+class WaitTaskSerializer(serializers.Serializer):
+    id = serializers.ListField(child=serializers.IntegerField(), min_length=1, max_length=1000)
+    since = serializers.DateTimeField(required=False)
+    timeout = serializers.FloatField(default=WAIT_TIMEOUT, min_value=0, max_value=WAIT_TIMEOUT)
+
+
+class TaskStatusQuerySerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), max_length=10000, default=list)
+    celery_ids = serializers.ListField(child=serializers.CharField(max_length=120), max_length=10000, default=list)
+    modified_since = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if not attrs['ids'] and not attrs['celery_ids']:
+            raise ValidationError(_('ids or celery_ids are required'))
+
+        return attrs
+
+
+class BulkTaskActionSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), max_length=10000, default=list)
+    terminate = serializers.BooleanField(default=False)
+
+
 class CreateTaskSerializer(serializers.Serializer):
     task_type = serializers.CharField(max_length=255)
     task_input = serializers.JSONField(default={})
     queue = serializers.CharField(max_length=32, default='celery')
     eta = serializers.DateTimeField(default=timezone.now)
     retryable = serializers.BooleanField(default=False)
-    max_retries = serializers.IntegerField(default=0)
+    max_retries = serializers.IntegerField(default=3, min_value=0)
     retry_seconds = serializers.IntegerField(default=0)
+    retry_backoff = serializers.ChoiceField(choices=RetryBackoffChoices.choices, allow_blank=True, default='')
+    priority = serializers.IntegerField(default=0, min_value=0, max_value=255)
+    dedupe_key = serializers.CharField(max_length=255, required=False, allow_null=True)
 
     def validate_task_type(self, value):
         if value not in REGISTRY.registry.keys():
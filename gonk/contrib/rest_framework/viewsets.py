@@ -1,5 +1,14 @@
+import asyncio
+import functools
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
@@ -8,7 +17,11 @@ from rest_framework import mixins
 from gonk.contrib.rest_framework.exceptions import APIValidationException
 from gonk.exceptions import TaskRunnerValidationException
 from gonk.models import Task
+from gonk.polling import await_changes, wait_for_changes
+from gonk.settings import POLL_MARGIN, SYNC_WAIT_TIMEOUT
 from gonk.contrib.rest_framework import permissions
+from gonk.contrib.rest_framework.filters import TaskFilterBackend
+from gonk.contrib.rest_framework.pagination import TaskCursorPagination, TaskLogCursorPagination
 from gonk.contrib.rest_framework import serializers
 
 
@@ -16,18 +29,39 @@ class TaskViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.Lis
     serializer_class = serializers.TaskSerializer
     queryset = Task.objects.all()
     permission_classes = (IsAuthenticated, )
+    pagination_class = TaskCursorPagination
+    filter_backends = (TaskFilterBackend, )
 
     def get_queryset(self):
+        queryset = super().get_queryset()
+
+        if self.action == 'list':
+            queryset = queryset.only('created', *self.serializer_class.Meta.fields).order_by(
+                *TaskCursorPagination.ordering
+            )
+        if self.action in ('logs', 'progress'):
+            queryset = queryset.only('id', 'username')
+
         if self.request.user.is_superuser:
-            return super().get_queryset()
+            return queryset
 
-        return super().get_queryset().filter(username=self.request.user.username)
+        return queryset.filter(username=self.request.user.username)
 
     def get_serializer_class(self):
         if self.action == 'create':
             return serializers.CreateTaskSerializer
         if self.action == 'retrieve':
             return serializers.RetrieveTaskSerializer
+        if self.action == 'logs':
+            return serializers.TaskLogEntrySerializer
+        if self.action == 'progress':
+            return serializers.TaskProgressSerializer
+        if self.action == 'wait':
+            return serializers.WaitTaskSerializer
+        if self.action == 'statuses':
+            return serializers.TaskStatusQuerySerializer
+        if self.action in ('bulk_cancel', 'bulk_revert'):
+            return serializers.BulkTaskActionSerializer
 
         return self.serializer_class
 
@@ -37,9 +71,79 @@ class TaskViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.Lis
 
         return super().get_permissions()
 
-    def create(self, request, *args, **kwargs):
+    def get_etag(self, task_id, modified) -> str:
+        return quote_etag(f'{task_id}-{modified.timestamp()}')
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Supports conditional requests: when `If-None-Match` matches the task ETag a 304 response
+        is returned after reading the `modified` column only.
+        """
+        lookup = {self.lookup_field: self.kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        if_none_match = request.headers.get('If-None-Match')
+
+        if if_none_match:
+            queryset = self.filter_queryset(self.get_queryset()).values('id', 'modified')
+            task = get_object_or_404(queryset, **lookup)
+            etag = self.get_etag(task['id'], task['modified'])
+
+            if etag in parse_etags(if_none_match):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        task = self.get_object()
+        serializer = self.get_serializer(task)
+        return Response(serializer.data, headers={'ETag': self.get_etag(task.id, task.modified)})
+
+    @action(detail=False, methods=['get'])
+    def wait(self, request, *args, **kwargs) -> Response:
+        """
+        Long polling: blocks until any of the `id` tasks is modified after `since` or `timeout` seconds pass,
+        then returns the status of the modified tasks. Without `since` the current status is returned right away.
+        The request holds a worker thread, so it never waits more than `GONK_SYNC_WAIT_TIMEOUT` seconds.
+        """
+        ids = [i for value in request.query_params.getlist('id') for i in value.split(',') if i]
+        serializer = self.get_serializer(data={**request.query_params.dict(), 'id': ids})
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        queryset = self.get_queryset().filter(id__in=params['id'])
+        changes = wait_for_changes(queryset, params.get('since'), min(params['timeout'], SYNC_WAIT_TIMEOUT))
+        return Response(serializers.TaskChangeSerializer(changes, many=True).data)
+
+    @action(detail=False, methods=['post'], url_path='status')
+    def statuses(self, request, *args, **kwargs) -> Response:
+        """
+        Returns `[id, status, started_on, finished_on]` for many tasks, looked up by `ids` and/or `celery_ids`,
+        with a single query. With `modified_since` only the tasks modified after it are returned; the response
+        `timestamp` can be sent as the next `modified_since` to poll incrementally. It lags `GONK_POLL_MARGIN`
+        seconds behind the latest returned change, so changes that commit late are not missed.
+        """
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        queryset = self.get_queryset().filter(Q(id__in=params['ids']) | Q(celery_id__in=params['celery_ids']))
+
+        if params.get('modified_since'):
+            queryset = queryset.filter(modified__gt=params['modified_since'])
+
+        tasks = list(queryset.order_by().values_list('id', 'status', 'started_on', 'finished_on', 'modified'))
+        if tasks:
+            timestamp = max(task[4] for task in tasks) - timedelta(seconds=POLL_MARGIN)
+        else:
+            timestamp = params.get('modified_since') or timezone.now() - timedelta(seconds=POLL_MARGIN)
+
+        return Response({'timestamp': timestamp, 'tasks': [task[:4] for task in tasks]})
+
+    def create(self, request, *args, **kwargs):
+        many = isinstance(request.data, list)
+        serializer = self.get_serializer(data=request.data, many=many)
+        serializer.is_valid(raise_exception=True)
+        if many:
+            tasks = self.perform_bulk_create(serializer)
+            serializer = self.serializer_class(instance=tasks, many=True)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
         task = self.perform_create(serializer)
         headers = self.get_success_headers(serializer.data)
         serializer = self.serializer_class(instance=task)
@@ -54,6 +158,15 @@ class TaskViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.Lis
         except TaskRunnerValidationException as e:
             raise APIValidationException(str(e))
 
+    def perform_bulk_create(self, serializer):
+        try:
+            user = self.request.user
+            return Task.create_tasks(
+                {'username': user.username, **validated_data} for validated_data in serializer.validated_data
+            )
+        except TaskRunnerValidationException as e:
+            raise APIValidationException(str(e))
+
     @action(methods=['put', 'patch'], detail=True, permission_classes=[
         IsAuthenticated,
         permissions.CanRevertTaskPermission
@@ -75,3 +188,161 @@ class TaskViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.Lis
         serializer = self.get_serializer_class()
         serializer = serializer(instance=task)
         return Response(data=serializer.data, status=status.HTTP_200_OK)
+
+    def get_bulk_queryset(self, ids: list):
+        """
+        Tasks of a bulk action: the `ids` of the request body and/or the `status`, `queue` and `task_type`
+        query parameters. At least one of them is required so a request never targets every task by mistake.
+        """
+        if not ids and not any(request_filter in self.request.query_params
+                               for request_filter in ('status', 'queue', 'task_type')):
+            raise APIValidationException('ids or a status, queue or task_type filter are required')
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if ids:
+            queryset = queryset.filter(id__in=ids)
+
+        return queryset
+
+    @action(detail=False, methods=['post'], url_path='cancel', permission_classes=[
+        IsAuthenticated,
+        permissions.CanCancelTaskPermission
+    ])
+    def bulk_cancel(self, request, *args, **kwargs) -> Response:
+        """
+        Cancels the tasks looked up by the `ids` of the body and/or the `status`, `queue` and `task_type`
+        query parameters with a single UPDATE and one revoke broadcast. `terminate` kills running tasks.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        cancelled = self.get_bulk_queryset(params['ids']).cancel(terminate=params['terminate'])
+        return Response({'count': cancelled})
+
+    @action(detail=False, methods=['post'], url_path='revert', permission_classes=[
+        IsAuthenticated,
+        permissions.CanRevertTaskPermission
+    ])
+    def bulk_revert(self, request, *args, **kwargs) -> Response:
+        """
+        Reverts the done tasks of reversible runners, looked up like in `bulk_cancel`, and publishes them as one group.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        reverted = self.get_bulk_queryset(serializer.validated_data['ids']).revert()
+        return Response({'count': reverted})
+
+    @action(detail=True, methods=['get'])
+    def logs(self, request, *args, **kwargs) -> Response:
+        task = self.get_object()
+        paginator = TaskLogCursorPagination()
+        page = paginator.paginate_queryset(task.log_entries.all(), request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def progress(self, request, *args, **kwargs) -> Response:
+        """
+        Counts of the child tasks spawned by the task.
+        """
+        task = self.get_object()
+        serializer = self.get_serializer(task.get_progress())
+        return Response(serializer.data)
+
+
+class AsyncTaskViewSet(TaskViewSet):
+    """
+    `TaskViewSet` served as an async view. Creating, cancelling and reverting publish to the broker
+    from the executor and long polling waits on the event loop, so they do not hold a worker thread.
+    The other actions run in the database thread through `sync_to_async`.
+    """
+    view_is_async = True
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            return await view(request, *args, **kwargs)
+
+        return functools.update_wrapper(async_view, view)
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            if asyncio.iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    @action(detail=False, methods=['get'])
+    async def wait(self, request, *args, **kwargs) -> Response:
+        ids = [i for value in request.query_params.getlist('id') for i in value.split(',') if i]
+        serializer = self.get_serializer(data={**request.query_params.dict(), 'id': ids})
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        queryset = self.get_queryset().filter(id__in=params['id'])
+        changes = await await_changes(queryset, params.get('since'), params['timeout'])
+        return Response(serializers.TaskChangeSerializer(changes, many=True).data)
+
+    async def create(self, request, *args, **kwargs):
+        if isinstance(request.data, list):
+            return await sync_to_async(super().create)(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        task = await self.aperform_create(serializer)
+        headers = self.get_success_headers(serializer.data)
+        serializer = self.serializer_class(instance=task)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    async def aperform_create(self, serializer):
+        try:
+            validated_data = serializer.validated_data
+            user = self.request.user
+            params = {'username': user.username, **validated_data}
+            return await Task.acreate_task(**params)
+        except TaskRunnerValidationException as e:
+            raise APIValidationException(str(e))
+
+    @action(methods=['put', 'patch'], detail=True, permission_classes=[
+        IsAuthenticated,
+        permissions.CanRevertTaskPermission
+    ])
+    async def revert(self, request, *args, **kwargs) -> Response:
+        task = await sync_to_async(self.get_object)()
+        await task.arevert()
+        serializer = self.get_serializer_class()
+        serializer = serializer(instance=task)
+        return Response(data=serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], permission_classes=[
+        IsAuthenticated,
+        permissions.CanCancelTaskPermission
+    ])
+    async def cancel(self, request, pk, *args, **kwargs) -> Response:
+        task = await sync_to_async(self.get_object)()
+        await task.acancel()
+        serializer = self.get_serializer_class()
+        serializer = serializer(instance=task)
+        return Response(data=serializer.data, status=status.HTTP_200_OK)
@@ -1,2 +1,9 @@
 class TaskRunnerValidationException(Exception):
     pass
+
+
+class TaskCancelled(Exception):
+    """
+    Raised by `TaskRunner.check_cancelled` to stop a task whose cancellation was requested.
+    """
+    pass
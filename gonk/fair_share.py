@@ -0,0 +1,34 @@
+import math
+from typing import List
+
+
+def fair_share(capacity: int, demands: dict) -> dict:
+    """
+    Splits `capacity` evenly between the keys of `demands`; what a key does not need goes to the others.
+    """
+    shares = dict.fromkeys(demands, 0)
+    remaining = {key: demand for key, demand in sorted(demands.items()) if demand > 0}
+
+    while capacity > 0 and remaining:
+        portion = max(capacity // len(remaining), 1)
+
+        for key in list(remaining):
+            given = min(portion, remaining[key], capacity)
+            shares[key] += given
+            remaining[key] -= given
+            capacity -= given
+
+            if not remaining[key]:
+                del remaining[key]
+            if not capacity:
+                break
+
+    return shares
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """
+    Nearest-rank percentile of sorted `values`.
+    """
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
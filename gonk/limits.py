@@ -0,0 +1,68 @@
+import logging
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Type
+
+from django.db import transaction
+from django.utils import timezone
+
+from gonk.models import HEARTBEAT_STATUSES, Task, TaskRunnerLimit
+from gonk.settings import LIMIT_DEFER
+from gonk.taskrunners import TaskRunner
+
+logger = logging.getLogger(__name__)
+
+
+def acquire(runner_path: str, taskrunner: Type[TaskRunner]) -> bool:
+    """
+    Takes a start slot of the runner type. The limit row stays locked until the calling transaction commits.
+    """
+    now = timezone.now()
+    burst = max(taskrunner.rate_limit or 0, 1)
+    limit, _ = TaskRunnerLimit.objects.select_for_update().get_or_create(
+        runner_path=runner_path,
+        defaults={'tokens': burst, 'updated': now},
+    )
+
+    if taskrunner.max_concurrency is not None:
+        # Reverts, reduces and tasks that did not stop yet hold a worker too
+        running = Task.objects.filter(runner_path=runner_path, status__in=HEARTBEAT_STATUSES).count()
+        if running >= taskrunner.max_concurrency:
+            return False
+
+    if taskrunner.rate_limit:
+        elapsed = max((now - limit.updated).total_seconds(), 0)
+        limit.tokens = min(limit.tokens + elapsed * taskrunner.rate_limit, burst)
+        limit.updated = now
+
+        if limit.tokens < 1:
+            limit.save(update_fields=['tokens', 'updated'])
+            return False
+
+        limit.tokens -= 1
+        limit.save(update_fields=['tokens', 'updated'])
+
+    return True
+
+
+@contextmanager
+def limit(task: Task, celery_task, **kwargs):
+    """
+    Yields whether the task may start under the limits of its runner; the start transition goes inside the block.
+    A task over the limits is published again with a short ETA instead of holding the worker.
+    """
+    taskrunner = task.get_taskrunner_class()
+    if taskrunner.max_concurrency is None and not taskrunner.rate_limit:
+        yield True
+        return
+
+    with transaction.atomic():
+        if acquire(task.runner_path, taskrunner):
+            yield True
+            return
+
+    logger.info(f'Task {task.id} is over the limits of its runner and is deferred')
+    eta = timezone.now() + timedelta(seconds=LIMIT_DEFER * random.uniform(1, 2))
+    task.dispatch(celery_task, kwargs=kwargs or None, queue=task.queue, priority=task.priority, eta=eta)
+    yield False
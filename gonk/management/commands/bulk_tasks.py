@@ -0,0 +1,105 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gonk.models import Task
+from gonk.registry import REGISTRY
+
+
+class Command(BaseCommand):
+    """
+        Usage:
+
+        python manage.py bulk_tasks cancel --task-type=<task_type> --status=PENDI,DOING
+        python manage.py bulk_tasks revert --queue="celery" --created-after=2024-01-01T00:00:00
+    """
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'operation',
+            type=str,
+            choices=['cancel', 'revert'],
+            help='Operation applied to every matching task'
+        )
+        parser.add_argument(
+            '--ids',
+            type=str,
+            required=False,
+            help='Comma separated task ids'
+        )
+        parser.add_argument(
+            '--task-type',
+            type=str,
+            required=False,
+            help='Comma separated task type identifiers'
+        )
+        parser.add_argument(
+            '--status',
+            type=str,
+            required=False,
+            help='Comma separated task statuses'
+        )
+        parser.add_argument(
+            '--queue',
+            type=str,
+            required=False,
+            help='Comma separated Celery queue names'
+        )
+        parser.add_argument(
+            '--username',
+            type=str,
+            required=False,
+            help='Owner of the tasks'
+        )
+        parser.add_argument(
+            '--created-after',
+            type=str,
+            required=False,
+            help='Minimum creation date -- ISO Format'
+        )
+        parser.add_argument(
+            '--created-before',
+            type=str,
+            required=False,
+            help='Maximum creation date -- ISO Format'
+        )
+        parser.add_argument(
+            '--terminate',
+            action='store_true',
+            help='Kill the worker processes of running tasks when cancelling'
+        )
+
+    def handle(self, operation, terminate, *args, **options):
+        queryset = self.get_queryset(**options)
+
+        if operation == 'cancel':
+            count = queryset.cancel(terminate=terminate)
+            self.stdout.write(self.style.SUCCESS(f'Cancelled {count} tasks'))
+        else:
+            count = queryset.revert()
+            self.stdout.write(self.style.SUCCESS(f'Reverting {count} tasks'))
+
+    def get_queryset(self, ids, task_type, status, queue, username, created_after, created_before, **options):
+        filters = {}
+
+        if ids:
+            filters['id__in'] = self.split(ids)
+        if task_type:
+            filters['runner_path__in'] = [REGISTRY.registry.get(t) for t in self.split(task_type)]
+        if status:
+            filters['status__in'] = self.split(status)
+        if queue:
+            filters['queue__in'] = self.split(queue)
+        if username:
+            filters['username'] = username
+        if created_after:
+            filters['created__gte'] = datetime.datetime.fromisoformat(created_after)
+        if created_before:
+            filters['created__lt'] = datetime.datetime.fromisoformat(created_before)
+
+        if not filters:
+            raise CommandError('At least one filter is required')
+
+        return Task.objects.filter(**filters)
+
+    def split(self, value: str) -> list:
+        return [v for v in value.split(',') if v]
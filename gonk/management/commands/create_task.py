@@ -6,6 +6,7 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 
 from gonk.models import Task
+from gonk.settings import BULK_BATCH_SIZE
 
 
 class Command(BaseCommand):
@@ -14,6 +15,7 @@ class Command(BaseCommand):
 
         python manage.py create_task <task_type> --raw-input='{}'
         cat file.json | python manage.py create_task <task_type> --queue="celery" --input -
+        cat inputs.ndjson | python manage.py create_task <task_type> --ndjson -
     """
     def add_arguments(self, parser):
         parser.add_argument(
@@ -33,6 +35,12 @@ class Command(BaseCommand):
             required=False,
             help='Raw string input -- Must be in json format'
         )
+        parser.add_argument(
+            '--ndjson',
+            type=argparse.FileType('r'),
+            required=False,
+            help='Newline delimited JSON file -- one task input per line, created in bulk'
+        )
         parser.add_argument(
             '--queue',
             type=str,
@@ -47,19 +55,24 @@ class Command(BaseCommand):
             help='Scheduled task run date -- ISO Format'
         )
 
-    def handle(self, task_type, input, raw_input, queue, when, *args, **options):
+    def handle(self, task_type, input, raw_input, ndjson, queue, when, *args, **options):
         data = None
         eta = timezone.now()
 
+        if when:
+            eta = datetime.datetime.fromisoformat(when)
+
+        if ndjson:
+            created = self.create_from_ndjson(task_type, ndjson, queue, eta)
+            self.stdout.write(self.style.SUCCESS(f'Created {created} tasks to run on {eta}'))
+            return
+
         if input:
             data = json.loads(input.read())
 
         if raw_input:
             data = json.loads(raw_input)
 
-        if when:
-            eta = datetime.datetime.fromisoformat(when)
-
         Task.create_task(
             task_type=task_type,
             task_input=data,
@@ -68,3 +81,28 @@ class Command(BaseCommand):
         )
 
         self.stdout.write(self.style.SUCCESS(f'Created task to run on {eta}'))
+
+    def create_from_ndjson(self, task_type, ndjson, queue, eta) -> int:
+        created = 0
+        batch = []
+
+        for line in ndjson:
+            line = line.strip()
+            if not line:
+                continue
+
+            batch.append({
+                'task_type': task_type,
+                'task_input': json.loads(line),
+                'queue': queue,
+                'eta': eta,
+            })
+
+            if len(batch) >= BULK_BATCH_SIZE:
+                created += len(Task.create_tasks(batch))
+                batch = []
+
+        if batch:
+            created += len(Task.create_tasks(batch))
+
+        return created
@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from gonk.models import Task
+
+
+class Command(BaseCommand):
+    """
+        Usage:
+
+        python manage.py report_task_wait --minutes=60
+    """
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minutes',
+            type=int,
+            required=False,
+            default=60,
+            help='Report the tasks started within the last minutes'
+        )
+
+    def handle(self, minutes, *args, **options):
+        report = Task.objects.wait_report(timezone.now() - timedelta(minutes=minutes))
+
+        self.stdout.write(self.style.SUCCESS(f'Queue wait (seconds) of the tasks started in the last {minutes} minutes:'))
+        self.stdout.write('{:30} {:15} {:>8} {:>10} {:>10} {:>10} {:>10}'.format(
+            'username', 'queue', 'count', 'mean', 'p50', 'p99', 'max'
+        ))
+
+        row_format = '{username:30} {queue:15} {count:>8} {mean:>10.2f} {p50:>10.2f} {p99:>10.2f} {max:>10.2f}'
+        for row in report:
+            self.stdout.write(row_format.format(**row))
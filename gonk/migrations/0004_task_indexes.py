@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gonk', '0003_alter_task_retry_time'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='task',
+            options={'ordering': ('created', 'id'), 'permissions': (('can_create_task', 'Can create task'), ('can_revert_task', 'Can revert task'), ('can_cancel_task', 'Can cancel task'))},
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['username', 'created'], name='gonk_task_username_created'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'queue'], name='gonk_task_status_queue'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('expire_on__isnull', False)), fields=['expire_on'], name='gonk_task_expire_on'),
+        ),
+    ]
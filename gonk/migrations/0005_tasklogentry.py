@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gonk', '0004_task_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('level', models.CharField(choices=[('INFO', 'Info'), ('WARN', 'Warning'), ('ERROR', 'Error')], default='INFO', max_length=5)),
+                ('message', models.TextField()),
+                ('status', models.CharField(blank=True, choices=[('ERROR', 'Error'), ('PENDI', 'To DO'), ('DOING', 'Doing'), ('DONE', 'Done'), ('CANCG', 'Cancelling'), ('CANCD', 'Canceled'), ('TOREV', 'To Revert'), ('REVTG', 'Reverting'), ('REVTD', 'Reverted'), ('RTRNG', 'Retrying'), ('RTERR', 'Retry error')], default='', max_length=5)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='log_entries', to='gonk.task')),
+            ],
+            options={
+                'verbose_name_plural': 'task log entries',
+                'ordering': ('id',),
+            },
+        ),
+    ]
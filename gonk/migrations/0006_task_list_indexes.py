@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gonk', '0005_tasklogentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['runner_path', 'status'], name='gonk_task_runner_status'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['created', 'id'], name='gonk_task_created'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gonk', '0006_task_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='task',
+            name='celery_id',
+            field=models.CharField(db_index=True, max_length=120),
+        ),
+    ]
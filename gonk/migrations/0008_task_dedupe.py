@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gonk', '0007_alter_task_celery_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='dedupe_key',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='input_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('input_hash__isnull', False), ('status', 'DONE')), fields=['input_hash', 'finished_on'], name='gonk_task_input_hash'),
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(condition=models.Q(('dedupe_key__isnull', False)), fields=('dedupe_key',), name='gonk_task_dedupe_key'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gonk', '0008_task_dedupe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='parent',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='gonk.task'),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='status',
+            field=models.CharField(choices=[('ERROR', 'Error'), ('PENDI', 'To DO'), ('DOING', 'Doing'), ('DONE', 'Done'), ('CANCG', 'Cancelling'), ('CANCD', 'Canceled'), ('TOREV', 'To Revert'), ('REVTG', 'Reverting'), ('REVTD', 'Reverted'), ('RTRNG', 'Retrying'), ('RTERR', 'Retry error'), ('WAITG', 'Waiting children'), ('REDCG', 'Reducing')], default='PENDI', max_length=5),
+        ),
+        migrations.AlterField(
+            model_name='tasklogentry',
+            name='status',
+            field=models.CharField(blank=True, choices=[('ERROR', 'Error'), ('PENDI', 'To DO'), ('DOING', 'Doing'), ('DONE', 'Done'), ('CANCG', 'Cancelling'), ('CANCD', 'Canceled'), ('TOREV', 'To Revert'), ('REVTG', 'Reverting'), ('REVTD', 'Reverted'), ('RTRNG', 'Retrying'), ('RTERR', 'Retry error'), ('WAITG', 'Waiting children'), ('REDCG', 'Reducing')], default='', max_length=5),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['parent', 'status'], name='gonk_task_parent_status'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gonk', '0009_task_parent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='retry_backoff',
+            field=models.CharField(blank=True, choices=[('FIXED', 'Fixed'), ('EXPON', 'Exponential'), ('JITTR', 'Decorrelated jitter')], default='', max_length=5),
+        ),
+        migrations.CreateModel(
+            name='TaskAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('runner_path', models.CharField(max_length=255)),
+                ('number', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('ERROR', 'Error'), ('PENDI', 'To DO'), ('DOING', 'Doing'), ('DONE', 'Done'), ('CANCG', 'Cancelling'), ('CANCD', 'Canceled'), ('TOREV', 'To Revert'), ('REVTG', 'Reverting'), ('REVTD', 'Reverted'), ('RTRNG', 'Retrying'), ('RTERR', 'Retry error'), ('WAITG', 'Waiting children'), ('REDCG', 'Reducing')], max_length=5)),
+                ('started_on', models.DateTimeField(blank=True, null=True)),
+                ('finished_on', models.DateTimeField(default=django.utils.timezone.now)),
+                ('retry_delay', models.DurationField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='gonk.task')),
+            ],
+            options={
+                'ordering': ('id',),
+                'indexes': [models.Index(fields=['runner_path', 'finished_on'], name='gonk_attempt_runner_finished')],
+            },
+        ),
+    ]
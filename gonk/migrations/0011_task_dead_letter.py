@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gonk', '0010_task_attempt'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'RTERR')), fields=['status', 'modified', 'id'], name='gonk_task_dead_letter'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:17
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_dispatched_on(apps, schema_editor):
+    # Existing tasks were already published, the fair-share dispatcher must not publish them again
+    Task = apps.get_model('gonk', 'Task')
+    Task.objects.using(schema_editor.connection.alias).update(dispatched_on=F('created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gonk', '0011_task_dead_letter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='dispatched_on',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_dispatched_on, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='task',
+            name='priority',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('dispatched_on__isnull', True), ('status', 'PENDI')), fields=['queue', 'username', '-priority', 'created'], name='gonk_task_undispatched'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('started_on__isnull', False)), fields=['started_on'], name='gonk_task_started_on'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:20
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gonk', '0012_task_priority'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskRunnerLimit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('runner_path', models.CharField(max_length=255, unique=True)),
+                ('tokens', models.FloatField(default=0)),
+                ('updated', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
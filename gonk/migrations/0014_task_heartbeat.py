@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gonk', '0013_taskrunnerlimit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='heartbeat',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'heartbeat'], name='gonk_task_heartbeat'),
+        ),
+    ]
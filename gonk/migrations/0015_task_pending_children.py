@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gonk', '0014_task_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='pending_children',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gonk', '0015_task_pending_children'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='task',
+            name='gonk_task_dedupe_key',
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(condition=models.Q(('dedupe_key__isnull', False)), fields=('username', 'dedupe_key'), name='gonk_task_dedupe_key'),
+        ),
+    ]
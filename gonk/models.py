@@ -1,18 +1,170 @@
-import importlib
+import hashlib
+import json
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import Type, Optional
+from functools import partial
+from time import monotonic
+from typing import Iterable, List, Type, Optional
 
-from django.db import models
+from asgiref.sync import sync_to_async
+from celery.utils import uuid
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, connections, models, router, transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
 from django.utils.text import gettext_lazy as _
 
+from gonk import backoff
+from gonk.fair_share import fair_share, percentile
 from gonk.registry import REGISTRY
-from gonk.settings import TaskStatusChoices
+from gonk.settings import TaskStatusChoices, TaskLogLevelChoices, RetryBackoffChoices, BULK_BATCH_SIZE, \
+    CLEANUP_BATCH_SIZE, CLEANUP_TIME_BUDGET, DEDUPE_WINDOW, FAIR_SHARE, FAIR_SHARE_QUEUE_LIMIT, FAIR_SHARE_USER_LIMIT, \
+    HEARTBEAT_INTERVAL, LOG_BUFFER_SIZE, RETRY_BACKOFF_CAP, TASK_SNAPSHOT
 from gonk.taskrunners import TaskRunner
 
+UNFINISHED_STATUSES = (
+    TaskStatusChoices.PENDING,
+    TaskStatusChoices.DOING,
+    TaskStatusChoices.RETRYING,
+    TaskStatusChoices.WAITING,
+    TaskStatusChoices.REDUCING,
+    TaskStatusChoices.CANCELLING,
+)
+RUNNING_STATUSES = (
+    TaskStatusChoices.DOING,
+    TaskStatusChoices.RETRYING,
+    TaskStatusChoices.REVERTING,
+    TaskStatusChoices.REDUCING,
+)
+# Statuses of the tasks that are cancelled right away since no worker is running them
+IDLE_STATUSES = (
+    TaskStatusChoices.PENDING,
+    TaskStatusChoices.ERROR,
+    TaskStatusChoices.WAITING,
+    TaskStatusChoices.TO_REVERT,
+)
+CANCEL_STATUSES = (TaskStatusChoices.CANCELLING, TaskStatusChoices.CANCELED)
+# Statuses of the tasks held by a worker, which keeps their heartbeat fresh
+HEARTBEAT_STATUSES = RUNNING_STATUSES + (TaskStatusChoices.CANCELLING,)
+# Failed tasks that `Task.retry` runs again
+RETRY_PENDING = Q(status=TaskStatusChoices.ERROR, retryable=True, retries__lt=F('max_retries'))
+
+
+class TaskQuerySet(models.QuerySet):
+    def dead_letters(self) -> 'TaskQuerySet':
+        """
+        Tasks that exhausted their retries, most recent first.
+        """
+        return self.filter(status=TaskStatusChoices.RETRY_ERROR).order_by('-modified', '-id')
+
+    def stale(self, timeout: float) -> 'TaskQuerySet':
+        """
+        Tasks held by a worker without a heartbeat for `timeout` seconds, oldest first.
+        """
+        deadline = timezone.now() - timedelta(seconds=timeout)
+        return self.filter(status__in=HEARTBEAT_STATUSES, heartbeat__lt=deadline).order_by('heartbeat')
+
+    def wait_report(self, since: datetime) -> List[dict]:
+        """
+        Seconds the tasks started after `since` waited for a worker once due, by user and queue.
+        Retried tasks are left out since `started_on` is the start of their last attempt.
+        """
+        waits = {}
+        rows = self.filter(started_on__gte=since, retries=0).order_by().values_list(
+            'username', 'queue', Coalesce('dispatched_on', 'created'), 'started_on',
+        )
+
+        for username, queue, due, started_on in rows.iterator():
+            waits.setdefault((username, queue), []).append(max((started_on - due).total_seconds(), 0))
+
+        report = []
+        for (username, queue), values in sorted(waits.items()):
+            values.sort()
+            report.append({
+                'username': username,
+                'queue': queue,
+                'count': len(values),
+                'mean': sum(values) / len(values),
+                'p50': percentile(values, 50),
+                'p99': percentile(values, 99),
+                'max': values[-1],
+            })
+
+        return report
+
+    def cancel(self, terminate: bool = False) -> int:
+        """
+        Cancels the tasks with one UPDATE per batch and one revoke broadcast. Returns the number of tasks cancelled.
+        """
+        from celery import current_app
+
+        statuses = IDLE_STATUSES + (HEARTBEAT_STATUSES if terminate else RUNNING_STATUSES)
+        status = Value(TaskStatusChoices.CANCELED)
+        if not terminate:
+            status = Case(
+                When(status__in=RUNNING_STATUSES, then=Value(TaskStatusChoices.CANCELLING)),
+                default=status,
+            )
+
+        with transaction.atomic():
+            # The locked statuses are the ones replaced, workers cannot move the tasks meanwhile
+            rows = list(self.filter(status__in=statuses).order_by().select_for_update().values_list(
+                'id', 'celery_id', 'parent_id', 'status',
+            ))
+            if not rows:
+                return 0
+
+            current_app.control.revoke([celery_id for _, celery_id, _, _ in rows if celery_id], terminate=terminate)
+
+            now = timezone.now()
+            for i in range(0, len(rows), BULK_BATCH_SIZE):
+                ids = [task_id for task_id, _, _, _ in rows[i:i + BULK_BATCH_SIZE]]
+                self.model.objects.filter(id__in=ids).update(status=status, modified=now)
+
+            # Cancelled children may be the last ones a waiting parent was waiting for
+            finished = {}
+            for _, _, parent_id, previous in rows:
+                if parent_id and (terminate or previous not in RUNNING_STATUSES):
+                    finished[parent_id] = finished.get(parent_id, 0) + 1
+            for parent_id, count in finished.items():
+                self.model.schedule_reduce(parent_id, finished=count)
+
+        return len(rows)
+
+    def revert(self) -> int:
+        """
+        Reverts the done tasks of reversible runners. Returns the number of tasks reverted.
+        """
+        from celery import group
+        from gonk.tasks import to_revert
+
+        now = timezone.now()
+        tasks = []
+
+        with transaction.atomic():
+            # The done rows stay locked until they are updated, so every selected task is reverted
+            done = self.filter(status=TaskStatusChoices.DONE).order_by().select_for_update()
+            for task in done.only('id', 'runner_path').iterator():
+                if task.get_taskrunner_class().reversible:
+                    task.celery_id = uuid()
+                    task.status = TaskStatusChoices.TO_REVERT
+                    task.modified = now
+                    tasks.append(task)
+
+            if not tasks:
+                return 0
+
+            self.model.objects.bulk_update(tasks, ['celery_id', 'status', 'modified'], batch_size=BULK_BATCH_SIZE)
+            transaction.on_commit(group(
+                to_revert.signature(kwargs={'task_id': task.id}, task_id=task.celery_id) for task in tasks
+            ).apply_async)
+
+        return len(tasks)
+
 
 class Task(models.Model):
-    celery_id = models.CharField(max_length=120)
+    celery_id = models.CharField(max_length=120, db_index=True)
     runner_path = models.CharField(max_length=255)
     input = models.JSONField(default=dict)
 
@@ -37,8 +189,46 @@ class Task(models.Model):
     retry_time = models.DurationField(default=timedelta(seconds=0), null=True, blank=True)
     retries = models.PositiveIntegerField(default=0)
     max_retries = models.PositiveIntegerField(default=3)
+    retry_backoff = models.CharField(max_length=5, choices=RetryBackoffChoices.choices, blank=True, default='')
+
+    priority = models.PositiveSmallIntegerField(default=0)
+    dispatched_on = models.DateTimeField(null=True, blank=True)
+    heartbeat = models.DateTimeField(null=True, blank=True)
+
+    dedupe_key = models.CharField(max_length=255, null=True, blank=True)
+    input_hash = models.CharField(max_length=64, null=True, blank=True)
+
+    parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE,
+                               related_name='children', db_index=False)
+    # Children that did not finish yet, set once the task is waiting for them
+    pending_children = models.IntegerField(default=0)
+
+    objects = TaskQuerySet.as_manager()
 
     class Meta:
+        ordering = ('created', 'id')
+        indexes = (
+            models.Index(fields=('username', 'created'), name='gonk_task_username_created'),
+            models.Index(fields=('status', 'queue'), name='gonk_task_status_queue'),
+            models.Index(fields=('runner_path', 'status'), name='gonk_task_runner_status'),
+            models.Index(fields=('created', 'id'), name='gonk_task_created'),
+            models.Index(fields=('expire_on',), name='gonk_task_expire_on',
+                         condition=models.Q(expire_on__isnull=False)),
+            models.Index(fields=('parent', 'status'), name='gonk_task_parent_status'),
+            models.Index(fields=('queue', 'username', '-priority', 'created'), name='gonk_task_undispatched',
+                         condition=models.Q(dispatched_on__isnull=True, status=TaskStatusChoices.PENDING)),
+            models.Index(fields=('started_on',), name='gonk_task_started_on',
+                         condition=models.Q(started_on__isnull=False)),
+            models.Index(fields=('status', 'modified', 'id'), name='gonk_task_dead_letter',
+                         condition=models.Q(status=TaskStatusChoices.RETRY_ERROR)),
+            models.Index(fields=('status', 'heartbeat'), name='gonk_task_heartbeat'),
+            models.Index(fields=('input_hash', 'finished_on'), name='gonk_task_input_hash',
+                         condition=models.Q(input_hash__isnull=False, status=TaskStatusChoices.DONE)),
+        )
+        constraints = (
+            models.UniqueConstraint(fields=('username', 'dedupe_key'), name='gonk_task_dedupe_key',
+                                    condition=models.Q(dedupe_key__isnull=False)),
+        )
         permissions = (
             ('can_create_task', _('Can create task')),
             ('can_revert_task', _('Can revert task')),
@@ -46,17 +236,20 @@ class Task(models.Model):
         )
 
     @classmethod
-    def create_task(
+    def build_task(
             cls,
             task_type,
             task_input,
             username='',
-            eta: Optional[datetime] = None,
             queue='celery',
             retryable: bool = False,
             retry_seconds: int = 0,
-            max_retries: int = 0
-    ):
+            max_retries: int = 3,
+            retry_backoff: str = '',
+            priority: int = 0,
+            dedupe_key: Optional[str] = None,
+            parent: Optional['Task'] = None
+    ) -> 'Task':
         runner_path = REGISTRY.registry.get(task_type)
 
         retry_time = timedelta(seconds=retry_seconds)
@@ -69,23 +262,315 @@ class Task(models.Model):
             retryable=retryable,
             retry_time=retry_time,
             max_retries=max_retries,
+            retry_backoff=retry_backoff,
+            priority=priority,
+            parent=parent,
         )
 
-        expiration = task.get_taskrunner().expiration
-        task.expire_on = timezone.now() + expiration if expiration else None
+        taskrunner = task.get_taskrunner()
+        task.expire_on = timezone.now() + taskrunner.expiration if taskrunner.expiration else None
+
+        if taskrunner.deduplicate or taskrunner.results_ttl:
+            task.input_hash = cls.hash_input(runner_path, task_input)
+
+        task.dedupe_key = dedupe_key or (task.input_hash if taskrunner.deduplicate else None)
+        return task
+
+    @staticmethod
+    def hash_input(runner_path: str, task_input) -> str:
+        """
+        SHA-256 of the runner path and the canonical JSON of the input.
+        """
+        canonical = json.dumps([runner_path, task_input], sort_keys=True, separators=(',', ':'), cls=DjangoJSONEncoder)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    @classmethod
+    def create_task(
+            cls,
+            task_type,
+            task_input,
+            username='',
+            eta: Optional[datetime] = None,
+            queue='celery',
+            retryable: bool = False,
+            retry_seconds: int = 0,
+            max_retries: int = 3,
+            retry_backoff: str = '',
+            priority: int = 0,
+            dedupe_key: Optional[str] = None
+    ):
+        """
+        A task submitted again within `GONK_DEDUPE_WINDOW` returns the existing one.
+        """
+        task = cls.build_task(
+            task_type,
+            task_input,
+            username=username,
+            queue=queue,
+            retryable=retryable,
+            retry_seconds=retry_seconds,
+            max_retries=max_retries,
+            retry_backoff=retry_backoff,
+            priority=priority,
+            dedupe_key=dedupe_key,
+        )
+        if task.dedupe_key or task.input_hash:
+            return task.run_once(eta=eta)
+
         task.run(eta=eta)
         return task
 
     @classmethod
-    def cleanup(cls):
-        for t in Task.objects.filter(expire_on__lte=timezone.now()):
-            t.expire()
-            t.delete()
+    async def acreate_task(
+            cls,
+            task_type,
+            task_input,
+            username='',
+            eta: Optional[datetime] = None,
+            queue='celery',
+            retryable: bool = False,
+            retry_seconds: int = 0,
+            max_retries: int = 3,
+            retry_backoff: str = '',
+            priority: int = 0,
+            dedupe_key: Optional[str] = None
+    ):
+        task = cls.build_task(
+            task_type,
+            task_input,
+            username=username,
+            queue=queue,
+            retryable=retryable,
+            retry_seconds=retry_seconds,
+            max_retries=max_retries,
+            retry_backoff=retry_backoff,
+            priority=priority,
+            dedupe_key=dedupe_key,
+        )
+        if task.dedupe_key or task.input_hash:
+            return await sync_to_async(task.run_once)(eta=eta)
+
+        await task.arun(eta=eta)
+        return task
+
+    @classmethod
+    def create_tasks(cls, tasks: Iterable[dict]) -> List['Task']:
+        """
+        Creates and publishes a batch of tasks; every item takes the arguments of `create_task`.
+        :raises gonk.exceptions.TaskRunnerValidationException:
+        """
+        from celery import group
+
+        batch = []
+        etas = []
+
+        for params in tasks:
+            params = dict(params)
+            eta = params.pop('eta', None)
+            task = cls.build_task(**params)
+            task.validate()
+            task.celery_id = uuid()
+            task.dispatched_on = task.get_dispatched_on(eta)
+            batch.append(task)
+            etas.append(eta)
+
+        duplicates = cls.get_duplicates((task.username, task.dedupe_key) for task in batch if task.dedupe_key)
+        tasks = []
+        to_create = []
+
+        for task, eta in zip(batch, etas):
+            key = (task.username, task.dedupe_key)
+            if key in duplicates:
+                tasks.append(duplicates[key])
+                continue
+
+            if task.dedupe_key:
+                duplicates[key] = task
+
+            tasks.append(task)
+            to_create.append((task, eta))
+
+        if not to_create:
+            return tasks
+
+        created = [task for task, _ in to_create]
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    cls.objects.bulk_create(created, batch_size=BULK_BATCH_SIZE)
+            except IntegrityError:
+                # A concurrent submission inserted some of the same keys first
+                duplicates = cls.get_duplicates(
+                    (task.username, task.dedupe_key) for task in created if task.dedupe_key
+                )
+                if not duplicates:
+                    raise
+
+                tasks = [duplicates.get((task.username, task.dedupe_key), task) for task in tasks]
+                to_create = [
+                    (task, eta) for task, eta in to_create if (task.username, task.dedupe_key) not in duplicates
+                ]
+                created = [task for task, _ in to_create]
+                for task in created:
+                    task.id = None
+                cls.objects.bulk_create(created, batch_size=BULK_BATCH_SIZE)
+
+            cls.fill_ids(created)
+
+            # Parents count their children down as they finish, before any of them is published
+            parents = Counter(task.parent_id for task in created if task.parent_id)
+            for parent_id, count in parents.items():
+                cls.objects.filter(id=parent_id).update(pending_children=F('pending_children') + count)
+
+            signatures = group(
+                task.get_run_signature(eta=eta) for task, eta in to_create if task.dispatched_on
+            )
+            if signatures.tasks:
+                transaction.on_commit(signatures.apply_async)
+        return tasks
+
+    @classmethod
+    def fill_ids(cls, tasks: List['Task']):
+        """
+        Reads back the ids of bulk-created tasks on backends that do not return them.
+        """
+        if connections[router.db_for_write(cls)].features.can_return_rows_from_bulk_insert:
+            return
+
+        for i in range(0, len(tasks), BULK_BATCH_SIZE):
+            batch = {task.celery_id: task for task in tasks[i:i + BULK_BATCH_SIZE]}
+            for task_id, celery_id in cls.objects.filter(celery_id__in=batch).values_list('id', 'celery_id'):
+                batch[celery_id].id = task_id
+
+    @classmethod
+    def get_duplicates(cls, keys: Iterable[tuple]) -> dict:
+        """
+        Tasks submitted within `GONK_DEDUPE_WINDOW` by `(username, dedupe_key)`; older tasks release their key.
+        """
+        keys = set(keys)
+        if not keys:
+            return {}
+
+        window_start = timezone.now() - timedelta(seconds=DEDUPE_WINDOW)
+        duplicates = {}
+        stale = []
+        queryset = cls.objects.filter(
+            username__in={username for username, _ in keys},
+            dedupe_key__in={dedupe_key for _, dedupe_key in keys},
+        )
+
+        for task in queryset.defer('log').order_by():
+            key = (task.username, task.dedupe_key)
+            if key not in keys:
+                continue
+
+            if task.created >= window_start:
+                duplicates[key] = task
+            else:
+                stale.append(task.id)
+
+        if stale:
+            cls.objects.filter(id__in=stale, created__lt=window_start).update(dedupe_key=None)
+
+        return duplicates
+
+    @classmethod
+    def release_pending(cls,
+                        queue_limit: int = FAIR_SHARE_QUEUE_LIMIT,
+                        user_limit: int = FAIR_SHARE_USER_LIMIT) -> int:
+        """
+        Publishes the tasks held back by `GONK_FAIR_SHARE` evenly between users. Returns the number released.
+        """
+        from celery import group
+
+        now = timezone.now()
+        # Scheduled tasks only count once they are due
+        in_flight = cls.objects.filter(status__in=UNFINISHED_STATUSES, dispatched_on__lte=now).order_by().values(
+            'queue', 'username'
+        ).annotate(count=Count('id'))
+        waiting = cls.objects.filter(status=TaskStatusChoices.PENDING, dispatched_on__isnull=True).order_by().values(
+            'queue', 'username'
+        ).annotate(count=Count('id'))
+
+        running = {(row['queue'], row['username']): row['count'] for row in in_flight}
+        demands = {}
+        for row in waiting:
+            allowed = user_limit - running.get((row['queue'], row['username']), 0)
+            demands.setdefault(row['queue'], {})[row['username']] = max(min(row['count'], allowed), 0)
+
+        released = []
+
+        with transaction.atomic():
+            for queue, users in demands.items():
+                capacity = queue_limit - sum(count for (q, _), count in running.items() if q == queue)
+
+                for username, share in fair_share(capacity, users).items():
+                    if not share:
+                        continue
+
+                    released += cls.objects.filter(
+                        queue=queue,
+                        username=username,
+                        status=TaskStatusChoices.PENDING,
+                        dispatched_on__isnull=True,
+                    ).order_by('-priority', 'created').defer('log').select_for_update(skip_locked=True)[:share]
+
+            for i in range(0, len(released), BULK_BATCH_SIZE):
+                ids = [task.id for task in released[i:i + BULK_BATCH_SIZE]]
+                cls.objects.filter(id__in=ids).update(dispatched_on=now)
+
+            if released:
+                transaction.on_commit(group(task.get_run_signature() for task in released).apply_async)
+
+        return len(released)
+
+    @classmethod
+    def cleanup(cls, batch_size: int = CLEANUP_BATCH_SIZE, time_budget: Optional[float] = CLEANUP_TIME_BUDGET) -> int:
+        """
+        Deletes expired tasks in batches within `time_budget` seconds. Returns the number of deleted tasks.
+        """
+        deadline = monotonic() + time_budget if time_budget else None
+        expired = cls.objects.filter(expire_on__lte=timezone.now())
+        deleted = 0
+
+        runner_paths = list(expired.order_by().values_list('runner_path', flat=True).distinct())
+
+        for runner_path in runner_paths:
+            taskrunner = REGISTRY.get_taskrunner_class(runner_path)
+            must_expire = getattr(taskrunner, 'expire', TaskRunner.expire) is not TaskRunner.expire
+            last_id = 0
+
+            while True:
+                batch = expired.filter(runner_path=runner_path, id__gt=last_id).order_by('id')[:batch_size]
+
+                if must_expire:
+                    tasks = list(batch)
+                    for task in tasks:
+                        taskrunner(task).expire()
+                    ids = [task.id for task in tasks]
+                else:
+                    ids = list(batch.values_list('id', flat=True))
+
+                if not ids:
+                    break
+
+                _, deleted_rows = cls.objects.filter(id__in=ids).only('id').delete()
+                deleted += deleted_rows.get(cls._meta.label, 0)
+                last_id = ids[-1]
+
+                if deadline and monotonic() >= deadline:
+                    return deleted
+
+        return deleted
 
     def get_taskrunner_class(self) -> Type[TaskRunner]:
-        class_module, class_name = self.runner_path.rsplit('.', 1)
-        module = importlib.import_module(class_module)
-        return getattr(module, class_name)
+        cached = getattr(self, '_taskrunner_class', None)
+        if cached and cached[0] == self.runner_path:
+            return cached[1]
+
+        taskrunner = REGISTRY.get_taskrunner_class(self.runner_path)
+        self._taskrunner_class = (self.runner_path, taskrunner)
+        return taskrunner
 
     def get_taskrunner(self) -> TaskRunner:
         taskrunner = self.get_taskrunner_class()
@@ -94,64 +579,483 @@ class Task(models.Model):
     def validate(self) -> bool:
         return self.get_taskrunner().validate()
 
-    def run(self, eta: Optional[datetime] = None):
+    def get_run_kwargs(self) -> dict:
+        if TASK_SNAPSHOT:
+            from gonk.snapshots import get_snapshot
+
+            return {'task_id': self.id, 'snapshot': get_snapshot(self)}
+
+        return {'task_id': self.id}
+
+    def dispatch(self, celery_task, kwargs: Optional[dict] = None, **options):
+        """
+        Publishes `celery_task` for this task once the current transaction commits.
+        """
+        transaction.on_commit(partial(
+            celery_task.apply_async,
+            kwargs=kwargs or {'task_id': self.id},
+            task_id=self.celery_id,
+            **options
+        ))
+
+    async def apublish(self, celery_task, kwargs: Optional[dict] = None, **options):
+        """
+        Publishes `celery_task` without blocking the event loop.
+        """
+        await sync_to_async(celery_task.apply_async, thread_sensitive=False)(
+            kwargs=kwargs or {'task_id': self.id},
+            task_id=self.celery_id,
+            **options
+        )
+
+    def get_run_signature(self, eta: Optional[datetime] = None):
         from gonk.tasks import to_run
 
+        return to_run.signature(
+            kwargs=self.get_run_kwargs(),
+            queue=self.queue,
+            priority=self.priority,
+            eta=eta,
+            task_id=self.celery_id,
+        )
+
+    def uses_fair_share(self, eta: Optional[datetime] = None) -> bool:
+        return FAIR_SHARE and (eta is None or eta <= timezone.now())
+
+    def get_dispatched_on(self, eta: Optional[datetime] = None) -> Optional[datetime]:
+        """
+        None while the fair-share dispatcher holds the task.
+        """
+        if self.uses_fair_share(eta):
+            return None
+
+        now = timezone.now()
+        return eta if eta is not None and eta > now else now
+
+    def prepare_run(self, eta: Optional[datetime] = None):
         self.validate()
+        self.celery_id = uuid()
+        self.status = TaskStatusChoices.PENDING
+        self.dispatched_on = self.get_dispatched_on(eta)
 
-        if not self.id:
+        if self.id:
+            self.save(update_fields=['celery_id', 'status', 'dispatched_on', 'modified'])
+        else:
             self.save()
 
-        celery_task = to_run.apply_async(queue=self.queue, kwargs={'task_id': self.id}, eta=eta)
-        self.celery_id = celery_task.id
+    def run(self, eta: Optional[datetime] = None):
+        from gonk.tasks import to_run
+
+        self.prepare_run(eta)
+        if self.dispatched_on:
+            self.dispatch(to_run, kwargs=self.get_run_kwargs(), queue=self.queue, priority=self.priority, eta=eta)
+
+    def run_once(self, eta: Optional[datetime] = None) -> 'Task':
+        """
+        Runs the task unless a duplicate exists, which is returned instead.
+        """
+        if self.dedupe_key:
+            key = (self.username, self.dedupe_key)
+            duplicate = self.get_duplicates([key]).get(key)
+            if duplicate:
+                return duplicate
+
+        try:
+            with transaction.atomic():
+                if not self.reuse_results():
+                    self.run(eta=eta)
+        except IntegrityError:
+            if not self.dedupe_key:
+                raise
+            # A concurrent submission inserted the same key first
+            self.id = None
+            return Task.objects.defer('log').get(username=self.username, dedupe_key=self.dedupe_key)
 
-        self.save(update_fields=['celery_id'])
+        return self
 
-    def retry(self):
+    def reuse_results(self) -> bool:
+        results_ttl = self.get_taskrunner().results_ttl
+        if not results_ttl or not self.input_hash:
+            return False
+
+        self.validate()
+        now = timezone.now()
+        done = Task.objects.filter(
+            input_hash=self.input_hash,
+            status=TaskStatusChoices.DONE,
+            finished_on__gte=now - results_ttl,
+        ).order_by('-finished_on').values_list('id', 'results').first()
+
+        if done is None:
+            return False
+
+        self.results = done[1]
+        self.status = TaskStatusChoices.DONE
+        self.started_on = now
+        self.finished_on = now
+        self.log_status(f'RESULTS REUSED FROM TASK {done[0]}')
+        self.save()
+        return True
+
+    async def arun(self, eta: Optional[datetime] = None):
+        from gonk.tasks import to_run
+
+        await sync_to_async(self.prepare_run)(eta)
+        if self.dispatched_on:
+            await self.apublish(to_run, kwargs=self.get_run_kwargs(), queue=self.queue, priority=self.priority, eta=eta)
+
+    def can_retry(self) -> bool:
+        return self.retryable and self.retries < self.max_retries
+
+    def retry(self, celery_id: Optional[str] = None) -> Optional[timedelta]:
+        """
+        Schedules the next attempt of a failed task and returns its delay.
+        `celery_id` is the id of the attempt when it was already saved along with the `ERROR` status.
+        """
         if not self.retryable:
-            return
+            return None
 
-        if self.retries > self.max_retries:
+        if not self.can_retry():
+            self.log_status(_('Max retries exceeded'), level=TaskLogLevelChoices.ERROR)
+            self.transition(TaskStatusChoices.RETRY_ERROR, expected=[TaskStatusChoices.ERROR])
             self.get_taskrunner().notify(_('Max retries exceeded'))
-            return
+            return None
 
         from gonk.tasks import to_retry
 
-        when = timezone.now() + self.retry_time
-        celery_task = to_retry.apply_async(queue=self.queue, kwargs={'task_id': self.id}, eta=when)
-        self.celery_id = celery_task.id
+        if celery_id is None:
+            self.celery_id = uuid()
+            self.save(update_fields=['celery_id', 'modified'])
+
+        delay = self.get_retry_delay()
+        self.dispatch(to_retry, queue=self.queue, priority=self.priority, eta=timezone.now() + delay)
+        # The status is already saved, what was logged meanwhile is written now
+        self.flush_log()
+        return delay
+
+    def get_retry_delay(self) -> timedelta:
+        taskrunner = self.get_taskrunner_class()
+        strategy = self.retry_backoff or taskrunner.retry_backoff
+        cap = taskrunner.retry_backoff_cap or timedelta(seconds=RETRY_BACKOFF_CAP)
+        previous = None
+
+        if strategy == RetryBackoffChoices.JITTER:
+            previous = self.attempts.exclude(retry_delay=None).order_by('-id').values_list(
+                'retry_delay', flat=True
+            ).first()
+
+        delay = backoff.get_delay(strategy, self.retry_time or timedelta(0), self.retries, cap, previous)
+
+        if taskrunner.retry_budget is not None and self.is_retry_budget_exhausted():
+            self.log_status('RETRY BUDGET EXHAUSTED, RETRY PAUSED', level=TaskLogLevelChoices.WARNING)
+            delay = max(delay, taskrunner.retry_budget_window)
+
+        return delay
+
+    def is_retry_budget_exhausted(self) -> bool:
+        taskrunner = self.get_taskrunner_class()
+        attempts = TaskAttempt.objects.filter(
+            runner_path=self.runner_path,
+            finished_on__gte=timezone.now() - taskrunner.retry_budget_window,
+        ).aggregate(
+            total=Count('id'),
+            failed=Count('id', filter=Q(status=TaskStatusChoices.ERROR)),
+        )
 
-        self.save(update_fields=['celery_id'])
+        if attempts['total'] < taskrunner.retry_budget_min_attempts:
+            return False
 
-    def cancel(self, terminate=False):
+        return attempts['failed'] / attempts['total'] > taskrunner.retry_budget
+
+    def record_attempt(self, status: str, error: str = '', retry_delay: Optional[timedelta] = None):
+        """
+        Only retryable tasks keep a history of their attempts.
+        """
+        if not self.retryable:
+            return
+
+        TaskAttempt.objects.create(
+            task_id=self.id,
+            runner_path=self.runner_path,
+            number=self.retries + 1,
+            status=status,
+            started_on=self.started_on,
+            error=error,
+            retry_delay=retry_delay,
+        )
+
+    def revoke(self, terminate=False):
         from celery.result import AsyncResult
 
         AsyncResult(self.celery_id).revoke(terminate=terminate)
-        self.status = TaskStatusChoices.CANCELED
 
-        self.save()
+    def cancel(self, terminate=False) -> bool:
+        """
+        A running task stops at its next `check_cancelled` unless `terminate`. False for finished tasks.
+        """
+        self.revoke(terminate=terminate)
+        return self.prepare_cancel(terminate=terminate)
+
+    async def acancel(self, terminate=False) -> bool:
+        await sync_to_async(self.revoke, thread_sensitive=False)(terminate=terminate)
+        return await sync_to_async(self.prepare_cancel)(terminate=terminate)
+
+    def prepare_cancel(self, terminate=False) -> bool:
+        # A second round covers a task that started or stopped running between both updates
+        for _ in range(2):
+            # Killing the worker also completes a cancel that was already requested
+            if self.transition(TaskStatusChoices.CANCELED,
+                               expected=IDLE_STATUSES + (HEARTBEAT_STATUSES if terminate else ())):
+                self.notify_parent()
+                return True
+
+            if not terminate and self.transition(TaskStatusChoices.CANCELLING, expected=RUNNING_STATUSES):
+                return True
+
+        return False
+
+    def is_cancel_requested(self, max_age: float = 0) -> bool:
+        """
+        Reuses the last read for `max_age` seconds. A deleted task counts as cancelled.
+        """
+        probe = getattr(self, '_status_probe', None)
+        now = monotonic()
+
+        if probe is None or now - probe[0] >= max_age:
+            status = Task.objects.filter(id=self.id).values_list('status', flat=True).first()
+            probe = self._status_probe = (now, status)
+
+        return probe[1] is None or probe[1] in CANCEL_STATUSES
+
+    def prepare_revert(self):
+        self.celery_id = uuid()
+        self.status = TaskStatusChoices.TO_REVERT
+        self.save(update_fields=['celery_id', 'status', 'modified'])
 
     def revert(self):
         from gonk.tasks import to_revert
 
-        celery_task = to_revert.delay(task_id=self.id)
-        self.celery_id = celery_task.id
+        self.prepare_revert()
+        self.dispatch(to_revert)
+
+    async def arevert(self):
+        from gonk.tasks import to_revert
 
-        self.save(update_fields=['celery_id'])
+        await sync_to_async(self.prepare_revert)()
+        await self.apublish(to_revert)
 
     def expire(self):
         self.get_taskrunner().expire()
 
-    def log_status(self, record, checkpoint: bool = False):
-        now = timezone.now().strftime("%Y-%m-%d %H:%M:%S")
+    def spawn(self, task_type: str, inputs: Iterable[dict], **options) -> List['Task']:
+        children = Task.create_tasks(
+            {
+                'task_type': task_type,
+                'task_input': task_input,
+                'username': self.username,
+                'queue': self.queue,
+                **options,
+                'parent': self,
+            }
+            for task_input in inputs
+        )
+        self._spawned = getattr(self, '_spawned', 0) + len(children)
+        return children
+
+    def has_spawned(self) -> bool:
+        return bool(getattr(self, '_spawned', 0))
 
-        if checkpoint:
-            new_line = '{:20} {:70}  Status: {:>15}\n'.format(now, record, self.status)
-        else:
-            new_line = '{:20} {:70}\n'.format(now, record)
+    @classmethod
+    def get_children_progress(cls, parent_id: int) -> dict:
+        progress = cls.objects.filter(parent_id=parent_id).order_by().aggregate(
+            total=Count('id'),
+            done=Count('id', filter=Q(status=TaskStatusChoices.DONE)),
+            pending=Count('id', filter=Q(status__in=UNFINISHED_STATUSES) | RETRY_PENDING),
+        )
+        progress['failed'] = progress['total'] - progress['done'] - progress['pending']
+        return progress
+
+    def get_progress(self) -> dict:
+        return self.get_children_progress(self.id)
+
+    def wait_for_children(self, status: str) -> bool:
+        """
+        Moves the task from `status` to `WAITING`. Returns False if it left `status`.
+        """
+        with transaction.atomic():
+            if not self.transition(TaskStatusChoices.WAITING, expected=[status], results=self.results):
+                return False
+
+            # Read under the lock of the transition, a child that finishes later sees the task waiting
+            pending = Task.objects.filter(id=self.id).values_list('pending_children', flat=True).get()
+
+        if not pending:
+            self.reduce_when_done(self.id)
+        return True
+
+    @classmethod
+    def schedule_reduce(cls, parent_id: int, finished: int = 1):
+        """
+        Counts `finished` children of the parent down and reduces it once none is pending.
+        """
+        decrement = Greatest(F('pending_children') - finished, 0)
+        if cls.objects.filter(id=parent_id, pending_children__gt=finished).update(pending_children=decrement):
+            return
+
+        cls.objects.filter(id=parent_id).update(pending_children=decrement)
+        cls.reduce_when_done(parent_id)
+
+    @classmethod
+    def reduce_when_done(cls, parent_id: int):
+        """
+        Publishes the reduce of a waiting task once none of its children is pending.
+        """
+        from gonk.tasks import to_reduce
+
+        queue = cls.objects.filter(id=parent_id, status=TaskStatusChoices.WAITING).values_list(
+            'queue', flat=True
+        ).first()
+        # Checked again since a child cancelled after it failed is counted down twice
+        if queue is None or cls.get_children_progress(parent_id)['pending']:
+            return
+
+        transaction.on_commit(partial(to_reduce.apply_async, kwargs={'task_id': parent_id}, queue=queue))
+
+    def is_pending(self) -> bool:
+        return self.status in UNFINISHED_STATUSES or (self.status == TaskStatusChoices.ERROR and self.can_retry())
+
+    def notify_parent(self):
+        # A child that failed and will be retried is still pending
+        if self.parent_id and not self.is_pending():
+            self.schedule_reduce(self.parent_id)
+
+    def transition(self, status: str, expected: Optional[Iterable[str]] = None, **values) -> bool:
+        """
+        Moves the task to `status` with one UPDATE while its status is one of `expected`.
+        Returns whether the row was updated.
+        """
+        now = timezone.now()
+        queryset = Task.objects.filter(id=self.id)
+
+        if expected is not None:
+            queryset = queryset.filter(status__in=expected)
+
+        if not queryset.update(status=status, modified=now, **values):
+            return False
+
+        self.status = status
+        self.modified = now
+        for field, value in values.items():
+            setattr(self, field, value)
+
+        self.flush_log()
+        return True
 
-        self.log += new_line
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.flush_log()
+
+    def flush_log(self):
+        entries = getattr(self, '_log_buffer', None)
+        if not entries:
+            return
+
+        for entry in entries:
+            entry.task = self
+
+        TaskLogEntry.objects.bulk_create(entries, batch_size=LOG_BUFFER_SIZE)
+        entries.clear()
+
+    def is_heartbeat_due(self, now: datetime) -> bool:
+        return self.heartbeat is None or now - self.heartbeat >= timedelta(seconds=HEARTBEAT_INTERVAL)
+
+    def log_status(self, record, checkpoint: bool = False, level: str = TaskLogLevelChoices.INFO):
+        """
+        Buffers a log entry, written with the next save or once `GONK_LOG_BUFFER_SIZE` entries are buffered.
+        A checkpoint also saves the status right away.
+        """
+        entry = TaskLogEntry(
+            level=level,
+            message=str(record),
+            status=self.status if checkpoint else '',
+        )
+
+        if getattr(self, '_log_buffer', None) is None:
+            self._log_buffer = []
+        self._log_buffer.append(entry)
+
+        if self.id and not checkpoint and len(self._log_buffer) >= LOG_BUFFER_SIZE:
+            self.flush_log()
 
         if checkpoint:
-            self.save()
+            if not self.id:
+                self.save()
+            else:
+                now = timezone.now()
+                values = {
+                    # A cancel requested meanwhile is kept
+                    'status': Case(When(status__in=CANCEL_STATUSES, then=F('status')), default=Value(self.status)),
+                    'modified': now,
+                }
+                if self.status in HEARTBEAT_STATUSES and self.is_heartbeat_due(now):
+                    values['heartbeat'] = self.heartbeat = now
+
+                Task.objects.filter(id=self.id).update(**values)
+                self.modified = now
+                self.flush_log()
             self.get_taskrunner().notify(data=record)
+
+
+class TaskLogEntry(models.Model):
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='log_entries')
+    created = models.DateTimeField(default=timezone.now)
+    level = models.CharField(max_length=5,
+                             choices=TaskLogLevelChoices.choices,
+                             default=TaskLogLevelChoices.INFO)
+    message = models.TextField()
+    status = models.CharField(max_length=5, choices=TaskStatusChoices.choices, blank=True, default='')
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name_plural = _('task log entries')
+
+    def __str__(self):
+        created = self.created.strftime("%Y-%m-%d %H:%M:%S")
+
+        if self.status:
+            return '{:20} {:70}  Status: {:>15}\n'.format(created, self.message, self.status)
+
+        return '{:20} {:70}\n'.format(created, self.message)
+
+
+class TaskAttempt(models.Model):
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='attempts')
+    runner_path = models.CharField(max_length=255)
+    number = models.PositiveIntegerField()
+    status = models.CharField(max_length=5, choices=TaskStatusChoices.choices)
+    started_on = models.DateTimeField(null=True, blank=True)
+    finished_on = models.DateTimeField(default=timezone.now)
+    retry_delay = models.DurationField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+
+    class Meta:
+        ordering = ('id',)
+        indexes = (
+            models.Index(fields=('runner_path', 'finished_on'), name='gonk_attempt_runner_finished'),
+        )
+
+    @property
+    def duration(self) -> Optional[timedelta]:
+        if self.started_on is None:
+            return None
+
+        return self.finished_on - self.started_on
+
+
+class TaskRunnerLimit(models.Model):
+    """
+    Lock row and token bucket of a runner type with `max_concurrency` or `rate_limit`.
+    """
+    runner_path = models.CharField(max_length=255, unique=True)
+    tokens = models.FloatField(default=0)
+    updated = models.DateTimeField(default=timezone.now)
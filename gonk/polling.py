@@ -0,0 +1,59 @@
+import asyncio
+from datetime import datetime, timedelta
+from time import monotonic, sleep
+from typing import List, Optional
+
+from asgiref.sync import sync_to_async
+
+from gonk.settings import POLL_MARGIN, WAIT_INTERVAL
+
+CHANGE_FIELDS = ('id', 'status', 'modified')
+
+
+def get_changes(queryset, since: Optional[datetime]) -> List[dict]:
+    """
+    Returns the status of the tasks in `queryset` modified after `since`, or of all of them without `since`.
+    `modified` is set before a change commits, so tasks modified within `GONK_POLL_MARGIN` before `since` are
+    returned again.
+    """
+    if since is not None:
+        queryset = queryset.filter(modified__gt=since - timedelta(seconds=POLL_MARGIN))
+
+    return list(queryset.order_by().values(*CHANGE_FIELDS))
+
+
+def is_changed(changes: List[dict], since: Optional[datetime]) -> bool:
+    return since is None or any(change['modified'] > since for change in changes)
+
+
+def wait_for_changes(queryset, since: Optional[datetime], timeout: float, interval: float = WAIT_INTERVAL) -> List[dict]:
+    """
+    Polls `queryset` until any of its tasks is modified after `since` or `timeout` seconds pass.
+    """
+    deadline = monotonic() + timeout
+
+    while True:
+        changes = get_changes(queryset, since)
+        remaining = deadline - monotonic()
+
+        if is_changed(changes, since) or remaining <= 0:
+            return changes
+
+        sleep(min(interval, remaining))
+
+
+async def await_changes(queryset, since: Optional[datetime], timeout: float, interval: float = WAIT_INTERVAL) -> List[dict]:
+    """
+    Coroutine version of `wait_for_changes` for async views. Waiting does not hold a thread,
+    only every poll runs in the database thread.
+    """
+    deadline = monotonic() + timeout
+
+    while True:
+        changes = await sync_to_async(get_changes)(queryset, since)
+        remaining = deadline - monotonic()
+
+        if is_changed(changes, since) or remaining <= 0:
+            return changes
+
+        await asyncio.sleep(min(interval, remaining))
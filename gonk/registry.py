@@ -1,17 +1,42 @@
+from typing import Type
+
+from django.utils.module_loading import import_string
+
 from gonk.beat import add_beat_to_celery
 
 
 class TaskRegistry:
     def __init__(self):
         self.registry = {}
+        self.taskrunners = {}
+        self.classes = {}
+        self.task_types = {}
 
     def register(self, name, taskrunner):
-        self.registry[name] = f"{taskrunner.__module__}.{taskrunner.__qualname__}"
+        runner_path = f"{taskrunner.__module__}.{taskrunner.__qualname__}"
+        self.registry[name] = runner_path
+        self.taskrunners[name] = taskrunner
+        self.classes[runner_path] = taskrunner
+        self.task_types[runner_path] = name
 
     def register_beat(self, name, taskrunner, cron):
-        self.registry[name] = f"{taskrunner.__module__}.{taskrunner.__qualname__}"
+        self.register(name, taskrunner)
 
         add_beat_to_celery(name, 'gonk.tasks.run_schedule', cron, [name])
 
+    def get_taskrunner_class(self, runner_path: str) -> Type:
+        """
+        Resolves a runner path into its taskrunner class.
+        Registered taskrunners are a dict lookup; any other path is imported once and cached for the process.
+        """
+        try:
+            return self.classes[runner_path]
+        except KeyError:
+            taskrunner = self.classes[runner_path] = import_string(runner_path)
+            return taskrunner
+
+    def get_task_type(self, runner_path: str) -> str:
+        return self.task_types[runner_path]
+
 
 REGISTRY = TaskRegistry()
@@ -15,6 +15,8 @@ STATUS_REVERTING = 'REVTG'
 STATUS_REVERTED = 'REVTD'
 STATUS_RETRYING = 'RTRNG'
 STATUS_RETRY_ERROR = 'RTERR'
+STATUS_WAITING = 'WAITG'
+STATUS_REDUCING = 'REDCG'
 
 
 class TaskStatusChoices(models.TextChoices):
@@ -29,6 +31,55 @@ class TaskStatusChoices(models.TextChoices):
     REVERTED = STATUS_REVERTED, _('Reverted')
     RETRYING = STATUS_RETRYING, _('Retrying')
     RETRY_ERROR = STATUS_RETRY_ERROR, _('Retry error')
+    WAITING = STATUS_WAITING, _('Waiting children')
+    REDUCING = STATUS_REDUCING, _('Reducing')
+
+
+LOG_INFO = 'INFO'
+LOG_WARNING = 'WARN'
+LOG_ERROR = 'ERROR'
+
+
+class TaskLogLevelChoices(models.TextChoices):
+    INFO = LOG_INFO, _('Info')
+    WARNING = LOG_WARNING, _('Warning')
+    ERROR = LOG_ERROR, _('Error')
+
+
+BACKOFF_FIXED = 'FIXED'
+BACKOFF_EXPONENTIAL = 'EXPON'
+BACKOFF_JITTER = 'JITTR'
+
+
+class RetryBackoffChoices(models.TextChoices):
+    FIXED = BACKOFF_FIXED, _('Fixed')
+    EXPONENTIAL = BACKOFF_EXPONENTIAL, _('Exponential')
+    JITTER = BACKOFF_JITTER, _('Decorrelated jitter')
+
+
+BULK_BATCH_SIZE = getattr(settings, 'GONK_BULK_BATCH_SIZE', 1000)
+CANCEL_CHECK_INTERVAL = getattr(settings, 'GONK_CANCEL_CHECK_INTERVAL', 1)
+CLEANUP_BATCH_SIZE = getattr(settings, 'GONK_CLEANUP_BATCH_SIZE', 1000)
+CLEANUP_TIME_BUDGET = getattr(settings, 'GONK_CLEANUP_TIME_BUDGET', None)
+DEDUPE_WINDOW = getattr(settings, 'GONK_DEDUPE_WINDOW', 60 * 60)
+RETRY_BACKOFF_CAP = getattr(settings, 'GONK_RETRY_BACKOFF_CAP', 60 * 60)
+HEARTBEAT_INTERVAL = getattr(settings, 'GONK_HEARTBEAT_INTERVAL', 30)
+STALE_TIMEOUT = getattr(settings, 'GONK_STALE_TIMEOUT', None)
+STALE_INTERVAL = getattr(settings, 'GONK_STALE_INTERVAL', 60)
+FAIR_SHARE = getattr(settings, 'GONK_FAIR_SHARE', False)
+FAIR_SHARE_INTERVAL = getattr(settings, 'GONK_FAIR_SHARE_INTERVAL', 5)
+FAIR_SHARE_QUEUE_LIMIT = getattr(settings, 'GONK_FAIR_SHARE_QUEUE_LIMIT', 1000)
+FAIR_SHARE_USER_LIMIT = getattr(settings, 'GONK_FAIR_SHARE_USER_LIMIT', 100)
+LIMIT_DEFER = getattr(settings, 'GONK_LIMIT_DEFER', 1)
+LOG_BUFFER_SIZE = getattr(settings, 'GONK_LOG_BUFFER_SIZE', 100)
+LOG_PAGE_SIZE = getattr(settings, 'GONK_LOG_PAGE_SIZE', 100)
+LOG_TAIL_SIZE = getattr(settings, 'GONK_LOG_TAIL_SIZE', 100)
+TASK_PAGE_SIZE = getattr(settings, 'GONK_TASK_PAGE_SIZE', None)
+TASK_SNAPSHOT = getattr(settings, 'GONK_TASK_SNAPSHOT', False)
+WAIT_TIMEOUT = getattr(settings, 'GONK_WAIT_TIMEOUT', 30)
+WAIT_INTERVAL = getattr(settings, 'GONK_WAIT_INTERVAL', 0.5)
+SYNC_WAIT_TIMEOUT = getattr(settings, 'GONK_SYNC_WAIT_TIMEOUT', 5)
+POLL_MARGIN = getattr(settings, 'GONK_POLL_MARGIN', 5)
 
 
 OK = u'OK'
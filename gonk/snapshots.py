@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.db import DEFAULT_DB_ALIAS
+
+from gonk.models import Task
+
+
+def get_snapshot(task: Task) -> dict:
+    return {
+        'celery_id': task.celery_id,
+        'runner_path': task.runner_path,
+        'input': task.input,
+        'results': task.results,
+        'username': task.username,
+        'status': task.status,
+        'queue': task.queue,
+        'retryable': task.retryable,
+        'retry_time': task.retry_time.total_seconds() if task.retry_time is not None else None,
+        'retries': task.retries,
+        'max_retries': task.max_retries,
+        'retry_backoff': task.retry_backoff,
+        'priority': task.priority,
+        'parent_id': task.parent_id,
+    }
+
+
+def from_snapshot(task_id: int, snapshot: dict) -> Task:
+    """
+    Builds the task sent in a `to_run` message without a query; fields missing from it are deferred.
+    """
+    values = dict(snapshot, id=task_id)
+    if values.get('retry_time') is not None:
+        values['retry_time'] = timedelta(seconds=values['retry_time'])
+
+    field_names = [f.attname for f in Task._meta.concrete_fields if f.attname in values]
+    return Task.from_db(DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names])
@@ -1,11 +1,29 @@
-from typing import Optional
+from datetime import timedelta
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Optional
 
 from dateutil.relativedelta import relativedelta
 
+from gonk.exceptions import TaskCancelled
+from gonk.settings import RetryBackoffChoices, CANCEL_CHECK_INTERVAL
+
 
 class BaseTaskRunner:
     expiration: Optional[relativedelta] = None
     reversible: bool = True
+    deduplicate: bool = False
+    results_ttl: Optional[timedelta] = None
+    retry_backoff: str = RetryBackoffChoices.FIXED
+    retry_backoff_cap: Optional[timedelta] = None
+    # Retries pause for `retry_budget_window` while more than `retry_budget` of the recent attempts failed
+    retry_budget: Optional[float] = None
+    retry_budget_window: timedelta = timedelta(minutes=1)
+    retry_budget_min_attempts: int = 10
+    # Cluster wide limits: running tasks at once and starts per second
+    max_concurrency: Optional[int] = None
+    rate_limit: Optional[float] = None
+    # Seconds the status read by `should_stop` is reused before querying it again
+    cancel_check_interval: float = CANCEL_CHECK_INTERVAL
 
     def __init__(self, task):
         self.task = task
@@ -28,6 +46,33 @@ class BaseTaskRunner:
     def retry(self):
         raise NotImplementedError()
 
+    def reduce(self, children):
+        """
+        Called once every task spawned by `run` is done, with the queryset of those tasks.
+        """
+        raise NotImplementedError()
+
+    def should_stop(self) -> bool:
+        """
+        Whether the task was cancelled. Long runs should check it often and stop early;
+        the database is queried at most once every `cancel_check_interval` seconds.
+        """
+        return self.task.is_cancel_requested(self.cancel_check_interval)
+
+    def check_cancelled(self):
+        """
+        :raises gonk.exceptions.TaskCancelled:
+        """
+        if self.should_stop():
+            raise TaskCancelled(f'Task {self.task.id} was cancelled')
+
+    def spawn(self, task_type: str, inputs: Iterable[dict], **options) -> List['Task']:
+        """
+        Creates a child task of `task_type` for every input and publishes them as one group.
+        The task waits for its children and `reduce` is called when all of them are done.
+        """
+        return self.task.spawn(task_type, inputs, **options)
+
 
 class TaskRunner(BaseTaskRunner):
 
@@ -43,5 +88,65 @@ class TaskRunner(BaseTaskRunner):
     def retry(self):
         return self.run()
 
+    def reduce(self, children):
+        pass
+
     def expire(self):
         pass
+
+
+class ChunkedTaskRunner(TaskRunner):
+    """
+    Map style runner. The items of the task are split in chunks of `chunk_size`, every chunk is processed
+    by a child task of the same runner and the partial results are combined once all of them are done.
+    Every chunk stores its partial result when it finishes and a failed chunk is retried on its own,
+    up to `chunk_retries` times.
+    """
+    chunk_size: int = 1000
+    chunk_retries: int = 3
+    chunk_retry_seconds: int = 0
+
+    def validate(self):
+        pass
+
+    def iter_items(self) -> Iterable:
+        return self.task.input.get('items', [])
+
+    def process_chunk(self, chunk: list) -> Any:
+        raise NotImplementedError()
+
+    def combine(self, partials: Iterator) -> Any:
+        raise NotImplementedError()
+
+    def is_chunk(self) -> bool:
+        return bool(self.task.parent_id) and 'chunk' in self.task.input
+
+    def iter_chunks(self) -> Iterator[list]:
+        items = iter(self.iter_items())
+
+        while True:
+            chunk = list(islice(items, self.chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def run(self):
+        from gonk.registry import REGISTRY
+
+        if self.is_chunk():
+            self.task.results = {'partial': self.process_chunk(self.task.input['chunk'])}
+            return
+
+        chunks = self.spawn(
+            REGISTRY.get_task_type(self.task.runner_path),
+            ({'chunk': chunk} for chunk in self.iter_chunks()),
+            retryable=True,
+            max_retries=self.chunk_retries,
+            retry_seconds=self.chunk_retry_seconds,
+        )
+        if not chunks:
+            self.task.results = {'result': self.combine(iter(()))}
+
+    def reduce(self, children):
+        partials = children.values_list('results', flat=True).iterator()
+        self.task.results = {'result': self.combine(results['partial'] for results in partials)}
@@ -1,21 +1,30 @@
 import logging
 import sys
 import traceback
+from datetime import timedelta
 
 from celery import shared_task
 from celery.schedules import crontab
+from celery.utils import uuid
 from django.utils import timezone
 
 from gonk.beat import add_beat_to_celery
+from gonk.exceptions import TaskCancelled
+from gonk.limits import limit
 from gonk.models import Task
-from gonk.settings import TaskStatusChoices
+from gonk.settings import TaskStatusChoices, TaskLogLevelChoices, FAIR_SHARE, FAIR_SHARE_INTERVAL, STALE_INTERVAL, \
+    STALE_TIMEOUT
+from gonk.snapshots import from_snapshot
 
 logger = logging.getLogger(__name__)
 
 
-def execute(task_id, func):
+def execute(task_id, func, snapshot: dict = None):
     try:
-        task = Task.objects.get(pk=task_id)
+        if snapshot:
+            task = from_snapshot(task_id, snapshot)
+        else:
+            task = Task.objects.defer('log').get(pk=task_id)
         task.log_status('TASK FOUND')
     except Exception as e:
         logger.error(str(e))
@@ -23,56 +32,174 @@ def execute(task_id, func):
 
     try:
         func(task)
+    except TaskCancelled:
+        cancelled(task)
     except Exception as e:
         exc_type, exc_obj, exc_tb = sys.exc_info()
-        task.status = TaskStatusChoices.ERROR
-        task.results = {
+        logger.error(str(e), exc_info=True)
+        fail(task, str(e), results={
             "exception": str(e),
             "line": exc_tb.tb_lineno,
             "traceback": traceback.format_exc()
-        }
-        task.log_status(f'ERROR: {str(e)}', checkpoint=True)
-        logger.error(str(e), exc_info=True)
-        task.save()
+        })
+
 
-        # Schedule task for retry if task is retryable
-        task.retry()
+def fail(task, error: str, results: dict):
+    """
+    Moves a task that failed in its current status to `ERROR` and schedules its retry.
+    """
+    record = f'ERROR: {error}'
+    attempt = task.status in (TaskStatusChoices.DOING, TaskStatusChoices.RETRYING)
+    task.log_status(record, level=TaskLogLevelChoices.ERROR)
+    # The id of the next attempt, if any, is written along with the status
+    celery_id = uuid() if task.can_retry() else None
+    values = {'celery_id': celery_id} if celery_id else {}
+    if not task.transition(TaskStatusChoices.ERROR, expected=[task.status], results=results, **values):
+        cancelled(task)
+        return
+    task.get_taskrunner().notify(data=record)
+
+    # Schedule task for retry if task is retryable
+    retry_delay = task.retry(celery_id=celery_id)
+    if attempt:
+        task.record_attempt(TaskStatusChoices.ERROR, error=error, retry_delay=retry_delay)
+    task.notify_parent()
+    task.flush_log()
 
 
 def runner_func(task):
-    task.status = TaskStatusChoices.DOING
-    task.started_on = timezone.now()
-    task.save()
+    with limit(task, to_run, **task.get_run_kwargs()) as allowed:
+        if not allowed:
+            return
+
+        now = timezone.now()
+        if not task.transition(TaskStatusChoices.DOING,
+                               expected=[TaskStatusChoices.PENDING],
+                               started_on=now,
+                               heartbeat=now):
+            logger.info(f'Task {task.id} changed its status and will not be run')
+            return
+
     task.get_taskrunner().run()
-    task.finished_on = timezone.now()
-    task.status = TaskStatusChoices.DONE
-    task.save()
+    finish(task, TaskStatusChoices.DOING)
 
 
 def reverter_func(task):
-    task.status = TaskStatusChoices.REVERTING
-    task.revert_started_on = timezone.now()
-    task.save()
+    now = timezone.now()
+    if not task.transition(TaskStatusChoices.REVERTING,
+                           expected=[TaskStatusChoices.TO_REVERT],
+                           revert_started_on=now,
+                           heartbeat=now):
+        logger.info(f'Task {task.id} changed its status and will not be reverted')
+        return
+
     task.get_taskrunner().revert()
-    task.revert_finished_on = timezone.now()
-    task.status = TaskStatusChoices.REVERTED
-    task.save()
+    if not task.transition(TaskStatusChoices.REVERTED,
+                           expected=[TaskStatusChoices.REVERTING],
+                           revert_finished_on=timezone.now(),
+                           results=task.results):
+        cancelled(task)
 
 
 def retry_func(task):
-    task.status = TaskStatusChoices.RETRYING
-    task.retries += 1
-    task.started_on = timezone.now()
-    task.save()
+    with limit(task, to_retry) as allowed:
+        if not allowed:
+            return
+
+        now = timezone.now()
+        if not task.transition(TaskStatusChoices.RETRYING,
+                               expected=[TaskStatusChoices.ERROR],
+                               retries=task.retries + 1,
+                               started_on=now,
+                               heartbeat=now):
+            logger.info(f'Task {task.id} changed its status and will not be retried')
+            return
+
     task.get_taskrunner().retry()
-    task.finished_on = timezone.now()
-    task.status = TaskStatusChoices.DONE
-    task.save()
+    finish(task, TaskStatusChoices.RETRYING)
+
+
+def reducer_func(task):
+    if not task.transition(TaskStatusChoices.REDUCING,
+                           expected=[TaskStatusChoices.WAITING],
+                           heartbeat=timezone.now()):
+        logger.info(f'Task {task.id} changed its status and will not be reduced')
+        return
+
+    progress = task.get_progress()
+    if progress['failed']:
+        fail(task, f'{progress["failed"]} of {progress["total"]} child tasks failed', results=task.results)
+        return
+
+    task.get_taskrunner().reduce(task.children.order_by('id'))
+    if not task.transition(TaskStatusChoices.DONE,
+                           expected=[TaskStatusChoices.REDUCING],
+                           finished_on=timezone.now(),
+                           results=task.results):
+        cancelled(task)
+        return
+    task.notify_parent()
+    task.flush_log()
+
+
+def finish(task, status: str):
+    """
+    Marks a task that left `status` done, or waiting when it spawned children.
+    """
+    if task.has_spawned():
+        if not task.wait_for_children(status):
+            cancelled(task)
+            return
+        task.flush_log()
+        return
+
+    if not task.transition(TaskStatusChoices.DONE,
+                           expected=[status],
+                           finished_on=timezone.now(),
+                           results=task.results):
+        cancelled(task)
+        return
+    task.record_attempt(TaskStatusChoices.DONE)
+    task.notify_parent()
+    task.flush_log()
+
+
+def cancelled(task):
+    """
+    Completes the cancellation of a task that stopped while in `CANCELLING`.
+    """
+    if not task.transition(TaskStatusChoices.CANCELED,
+                           expected=[TaskStatusChoices.CANCELLING],
+                           finished_on=timezone.now()):
+        logger.info(f'Task {task.id} changed its status while running')
+        return
+
+    task.log_status('TASK CANCELLED')
+    task.flush_log()
+    task.get_taskrunner().notify(data='TASK CANCELLED')
+    task.notify_parent()
+
+
+def reap(task):
+    """
+    Recovers a task whose worker stopped sending heartbeats: a cancelling task is cancelled, a reducing one
+    is reduced again and the others fail, so they are retried when they are retryable.
+    """
+    logger.warning(f'Task {task.id} sent no heartbeat since {task.heartbeat.isoformat()}')
+
+    if task.status == TaskStatusChoices.CANCELLING:
+        cancelled(task)
+    elif task.status == TaskStatusChoices.REDUCING:
+        if task.transition(TaskStatusChoices.WAITING, expected=[TaskStatusChoices.REDUCING]):
+            task.reduce_when_done(task.id)
+    else:
+        error = f'Worker lost, no heartbeat since {task.heartbeat.isoformat()}'
+        fail(task, error, results={'exception': error})
 
 
 @shared_task()
-def to_run(task_id):
-    execute(task_id, runner_func)
+def to_run(task_id, snapshot: dict = None):
+    execute(task_id, runner_func, snapshot=snapshot)
 
 
 @shared_task()
@@ -85,6 +212,11 @@ def to_revert(task_id):
     execute(task_id, reverter_func)
 
 
+@shared_task()
+def to_reduce(task_id):
+    execute(task_id, reducer_func)
+
+
 @shared_task()
 def run_schedule(task_type, params: dict = None):
     if params is None:
@@ -95,9 +227,34 @@ def run_schedule(task_type, params: dict = None):
 
 @shared_task()
 def cleanup_gonk_tasks():
-    Task.cleanup()
+    deleted = Task.cleanup()
+    logger.info(f'Cleaned up {deleted} expired tasks')
+
+
+@shared_task()
+def reap_gonk_tasks():
+    stale = list(Task.objects.stale(STALE_TIMEOUT).defer('log'))
+    for task in stale:
+        reap(task)
+    logger.info(f'Reaped {len(stale)} stale tasks')
+
+
+@shared_task()
+def dispatch_gonk_tasks():
+    released = Task.release_pending()
+    logger.info(f'Released {released} pending tasks')
 
 
 add_beat_to_celery('cleanup_gonk_tasks',
                    'gonk.tasks.cleanup_gonk_tasks',
                    crontab(minute=0, hour=4), [])
+
+if FAIR_SHARE:
+    add_beat_to_celery('dispatch_gonk_tasks',
+                       'gonk.tasks.dispatch_gonk_tasks',
+                       timedelta(seconds=FAIR_SHARE_INTERVAL), [])
+
+if STALE_TIMEOUT:
+    add_beat_to_celery('reap_gonk_tasks',
+                       'gonk.tasks.reap_gonk_tasks',
+                       timedelta(seconds=STALE_INTERVAL), [])
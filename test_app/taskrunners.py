@@ -5,7 +5,8 @@ from dateutil.relativedelta import relativedelta
 
 from gonk.decorators import register, register_beat
 from gonk.exceptions import TaskRunnerValidationException
-from gonk.taskrunners import TaskRunner
+from gonk.taskrunners import ChunkedTaskRunner, TaskRunner
+from gonk.contrib.caching.mixins import CachedResultMixin
 from gonk.contrib.notifications.mercure import MercureNotificationMixin
 
 
@@ -25,6 +26,35 @@ class AddTaskRunner(MercureNotificationMixin, TaskRunner):
         del self.task.results['solution']
 
 
+@register('cached_add')
+class CachedAddTaskRunner(CachedResultMixin, AddTaskRunner):
+    pass
+
+
+@register('sum')
+class SumTaskRunner(TaskRunner):
+
+    def validate(self):
+        pass
+
+    def run(self):
+        self.spawn('add', self.task.input['pairs'])
+
+    def reduce(self, children):
+        self.task.results['solution'] = sum(child.results['solution'] for child in children.only('results'))
+
+
+@register('chunked_sum')
+class ChunkedSumTaskRunner(ChunkedTaskRunner):
+    chunk_size = 2
+
+    def process_chunk(self, chunk):
+        return sum(chunk)
+
+    def combine(self, partials):
+        return sum(partials)
+
+
 @register('sleep')
 class SleepTaskRunner(MercureNotificationMixin, TaskRunner):
 
@@ -1,6 +1,14 @@
+import copy
+from contextlib import contextmanager
+
+from celery import current_app
+from celery.utils import uuid
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Permission
 
+from gonk.models import Task
+from gonk.registry import REGISTRY
+
 User = get_user_model()
 
 
@@ -19,3 +27,21 @@ class CreateUserMixin:
         permission = Permission.objects.get(codename=name)
         user.user_permissions.add(permission)
         return user
+
+
+class CreateTaskMixin:
+    task_defaults = {'input': {'element1': 1, 'element2': 2}}
+
+    def create_task(self, task_type: str = 'add', **kwargs) -> Task:
+        params = {'celery_id': uuid(), **copy.deepcopy(self.task_defaults), **kwargs}
+        return Task.objects.create(runner_path=REGISTRY.registry[task_type], **params)
+
+
+class EagerCeleryMixin:
+    @contextmanager
+    def eager(self):
+        current_app.conf.task_always_eager = True
+        try:
+            yield
+        finally:
+            current_app.conf.task_always_eager = False
@@ -0,0 +1,82 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from gonk.models import Task
+from gonk.registry import REGISTRY
+from gonk.settings import TaskStatusChoices
+from gonk.tasks import to_revert, to_run
+from test_app.tests.mixins import CreateUserMixin
+
+
+class TestAsyncTaskApi(APITestCase, CreateUserMixin):
+    def setUp(self) -> None:
+        self.username = 'kenobi@starwars.com'
+        self.user = self.create_user(self.username, 'ihavethehighground')
+        self.client.force_authenticate(user=self.user)
+
+    def test_acreate_task(self):
+        with mock.patch.object(to_run, 'apply_async') as apply_async:
+            task = async_to_sync(Task.acreate_task)('add', {'element1': 1, 'element2': 2}, username=self.username)
+
+        task.refresh_from_db()
+        assert task.status == TaskStatusChoices.PENDING
+        apply_async.assert_called_once()
+        assert apply_async.call_args.kwargs['task_id'] == task.celery_id
+
+    def test_acancel_and_arevert(self):
+        task = Task.objects.create(runner_path=REGISTRY.registry['add'], username=self.username)
+
+        with mock.patch.object(to_revert, 'apply_async') as apply_async:
+            async_to_sync(task.arevert)()
+        apply_async.assert_called_once()
+        assert Task.objects.get(id=task.id).status == TaskStatusChoices.TO_REVERT
+
+        async_to_sync(task.acancel)()
+        assert Task.objects.get(id=task.id).status == TaskStatusChoices.CANCELED
+
+    def test_create_cancel_revert(self):
+        self.add_permission(self.user, 'can_create_task')
+        self.add_permission(self.user, 'can_cancel_task')
+        self.add_permission(self.user, 'can_revert_task')
+        data = {'task_type': 'add', 'task_input': {'element1': 0, 'element2': 3}}
+
+        with mock.patch.object(to_run, 'apply_async') as apply_async:
+            response = self.client.post('/async/tasks/', data=json.dumps(data), content_type='application/json')
+        assert response.status_code == status.HTTP_201_CREATED
+        apply_async.assert_called_once()
+
+        task_id = response.data['id']
+        response = self.client.get(f'/async/tasks/{task_id}/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['status'] == TaskStatusChoices.PENDING
+
+        with mock.patch.object(to_revert, 'apply_async'):
+            response = self.client.put(f'/async/tasks/{task_id}/revert/', content_type='application/json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['status'] == TaskStatusChoices.TO_REVERT
+
+        response = self.client.post(f'/async/tasks/{task_id}/cancel/', content_type='application/json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['status'] == TaskStatusChoices.CANCELED
+
+    def test_create_requires_permission(self):
+        data = {'task_type': 'add', 'task_input': {'element1': 0, 'element2': 3}}
+
+        response = self.client.post('/async/tasks/', data=json.dumps(data), content_type='application/json')
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_wait(self):
+        task = Task.objects.create(runner_path=REGISTRY.registry['add'], username=self.username)
+
+        since = task.modified + timedelta(minutes=1)
+        response = self.client.get('/async/tasks/wait/', {'id': task.id, 'since': since.isoformat(), 'timeout': 0.1})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == []
+
+        response = self.client.get('/async/tasks/wait/', {'id': task.id})
+        assert [t['id'] for t in response.data] == [task.id]
@@ -0,0 +1,148 @@
+import io
+import json
+from unittest import mock
+
+from celery import current_app
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from gonk.models import Task
+from gonk.settings import TaskStatusChoices
+from gonk.tasks import to_reduce, to_revert
+from test_app.tests.mixins import CreateTaskMixin, CreateUserMixin
+
+
+class TestTaskQuerySetBulkActions(TestCase, CreateTaskMixin):
+    def test_cancel(self):
+        pending = self.create_task()
+        running = self.create_task(status=TaskStatusChoices.DOING)
+        done = self.create_task(status=TaskStatusChoices.DONE)
+
+        with mock.patch.object(current_app.control, 'revoke') as revoke:
+            # Locked SELECT of the ids and UPDATE within a savepoint
+            with self.assertNumQueries(4):
+                assert Task.objects.all().cancel() == 2
+
+        revoke.assert_called_once()
+        assert sorted(revoke.call_args.args[0]) == sorted([pending.celery_id, running.celery_id])
+        assert revoke.call_args.kwargs == {'terminate': False}
+        assert Task.objects.get(id=pending.id).status == TaskStatusChoices.CANCELED
+        assert Task.objects.get(id=running.id).status == TaskStatusChoices.CANCELLING
+        assert Task.objects.get(id=done.id).status == TaskStatusChoices.DONE
+
+    def test_cancel_skips_cancelling_tasks(self):
+        cancelling = self.create_task(status=TaskStatusChoices.CANCELLING)
+
+        with mock.patch.object(current_app.control, 'revoke') as revoke:
+            assert Task.objects.all().cancel() == 0
+
+        revoke.assert_not_called()
+        assert Task.objects.get(id=cancelling.id).status == TaskStatusChoices.CANCELLING
+
+    def test_cancel_terminate(self):
+        running = self.create_task(status=TaskStatusChoices.DOING)
+
+        with mock.patch.object(current_app.control, 'revoke') as revoke:
+            assert Task.objects.filter(id=running.id).cancel(terminate=True) == 1
+
+        revoke.assert_called_once_with([running.celery_id], terminate=True)
+        assert Task.objects.get(id=running.id).status == TaskStatusChoices.CANCELED
+
+    def test_cancel_nothing(self):
+        self.create_task(status=TaskStatusChoices.DONE)
+
+        with mock.patch.object(current_app.control, 'revoke') as revoke:
+            assert Task.objects.all().cancel() == 0
+
+        revoke.assert_not_called()
+
+    def test_cancelled_children_reduce_their_parent(self):
+        parent = self.create_task('sum', status=TaskStatusChoices.WAITING)
+        self.create_task(parent=parent, status=TaskStatusChoices.DONE)
+        child = self.create_task(parent=parent)
+
+        with mock.patch.object(current_app.control, 'revoke'), mock.patch.object(to_reduce, 'apply_async') as reduce:
+            with self.captureOnCommitCallbacks(execute=True):
+                Task.objects.filter(id=child.id).cancel()
+
+        reduce.assert_called_once()
+        assert reduce.call_args.kwargs['kwargs'] == {'task_id': parent.id}
+
+    def test_revert(self):
+        done = [self.create_task(status=TaskStatusChoices.DONE) for _ in range(3)]
+        self.create_task('no_reversible', status=TaskStatusChoices.DONE)
+        self.create_task(status=TaskStatusChoices.PENDING)
+
+        with mock.patch('celery.group.apply_async', autospec=True) as apply_async:
+            # Locked SELECT of the tasks and UPDATE in bulk within a savepoint
+            with self.assertNumQueries(4), self.captureOnCommitCallbacks(execute=True):
+                assert Task.objects.all().revert() == 3
+
+        apply_async.assert_called_once()
+        signatures = apply_async.call_args.args[0].tasks
+        reverted = Task.objects.filter(status=TaskStatusChoices.TO_REVERT).order_by('id')
+        assert [task.id for task in reverted] == [task.id for task in done]
+        assert [(s.task, s.kwargs, s.id) for s in signatures] == [
+            (to_revert.name, {'task_id': task.id}, task.celery_id) for task in reverted
+        ]
+        assert all(task.celery_id not in [t.celery_id for t in done] for task in reverted)
+
+    def test_command(self):
+        pending = self.create_task(queue='slow')
+        other = self.create_task(queue='fast')
+        out = io.StringIO()
+
+        with mock.patch.object(current_app.control, 'revoke'):
+            call_command('bulk_tasks', 'cancel', task_type='add', queue='slow', stdout=out)
+
+        assert 'Cancelled 1 tasks' in out.getvalue()
+        assert Task.objects.get(id=pending.id).status == TaskStatusChoices.CANCELED
+        assert Task.objects.get(id=other.id).status == TaskStatusChoices.PENDING
+
+        with self.assertRaises(CommandError):
+            call_command('bulk_tasks', 'revert', stdout=out)
+
+
+class TestBulkActionsAPI(APITestCase, CreateUserMixin, CreateTaskMixin):
+    def setUp(self) -> None:
+        self.username = 'kenobi@starwars.com'
+        self.user = self.create_user(self.username, 'ihavethehighground')
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_cancel(self):
+        self.add_permission(self.user, 'can_cancel_task')
+        mine = self.create_task(username=self.username)
+        other = self.create_task(username='vader@starwars.com')
+
+        with mock.patch.object(current_app.control, 'revoke'):
+            response = self.client.post('/tasks/cancel/?status=PENDI', content_type='application/json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {'count': 1}
+        assert Task.objects.get(id=mine.id).status == TaskStatusChoices.CANCELED
+        assert Task.objects.get(id=other.id).status == TaskStatusChoices.PENDING
+
+    def test_bulk_cancel_requires_a_filter(self):
+        self.add_permission(self.user, 'can_cancel_task')
+
+        response = self.client.post('/tasks/cancel/', content_type='application/json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_bulk_cancel_no_permission(self):
+        response = self.client.post('/tasks/cancel/?status=PENDI', content_type='application/json')
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_bulk_revert(self):
+        self.add_permission(self.user, 'can_revert_task')
+        task = self.create_task(username=self.username, status=TaskStatusChoices.DONE)
+
+        with mock.patch('celery.group.apply_async'):
+            response = self.client.post('/tasks/revert/', data=json.dumps({'ids': [task.id]}),
+                                        content_type='application/json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {'count': 1}
+        assert Task.objects.get(id=task.id).status == TaskStatusChoices.TO_REVERT
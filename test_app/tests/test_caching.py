@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from gonk.contrib.caching.backends import MISSING, DjangoResultCache, LocalResultCache
+from gonk.settings import TaskStatusChoices
+from gonk.tasks import execute, runner_func
+from test_app.taskrunners import AddTaskRunner, CachedAddTaskRunner
+from test_app.tests.mixins import CreateTaskMixin
+
+
+class TestLocalResultCache(TestCase):
+    def test_least_recently_used_is_evicted(self):
+        cache = LocalResultCache(max_size=2, ttl=60)
+        cache.set('a', {'value': 1})
+        cache.set('b', {'value': 2})
+        cache.get('a')
+        cache.set('c', {'value': 3})
+
+        assert cache.get('b') is MISSING
+        assert cache.get('a') == {'value': 1}
+        assert cache.get_stats() == {'hits': 2, 'misses': 1, 'sets': 3, 'evictions': 1}
+
+    def test_entries_expire(self):
+        cache = LocalResultCache(max_size=2, ttl=60)
+
+        with mock.patch('gonk.contrib.caching.backends.monotonic', return_value=0):
+            cache.set('a', {'value': 1}, ttl=10)
+        with mock.patch('gonk.contrib.caching.backends.monotonic', return_value=11):
+            assert cache.get('a') is MISSING
+
+        assert cache.stats.evictions == 1
+
+    def test_cached_results_are_copies(self):
+        cache = LocalResultCache()
+        results = {'value': 1}
+        cache.set('a', results)
+        results['value'] = 2
+        cache.get('a')['value'] = 3
+
+        assert cache.get('a') == {'value': 1}
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TestDjangoResultCache(TestCase):
+    def test_get_and_set(self):
+        cache = DjangoResultCache()
+        assert cache.get('gonk-test') is MISSING
+
+        cache.set('gonk-test', {'value': 1})
+        assert cache.get('gonk-test') == {'value': 1}
+        assert cache.get_stats() == {'hits': 1, 'misses': 1, 'sets': 1, 'evictions': 0}
+        caches['default'].clear()
+
+    def test_zero_ttl_keeps_results(self):
+        cache = DjangoResultCache(ttl=0)
+
+        cache.set('gonk-test', {'value': 1})
+        assert cache.get('gonk-test') == {'value': 1}
+        caches['default'].clear()
+
+
+class TestCachedResultMixin(TestCase, CreateTaskMixin):
+    def setUp(self) -> None:
+        self.cache = LocalResultCache()
+        patcher = mock.patch.object(CachedAddTaskRunner, 'result_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_identical_input_is_not_run_again(self):
+        with mock.patch.object(AddTaskRunner, 'run', autospec=True, side_effect=AddTaskRunner.run) as run:
+            first = self.create_task('cached_add', input={'element1': 1, 'element2': 2})
+            second = self.create_task('cached_add', input={'element2': 2, 'element1': 1})
+            execute(first.id, runner_func)
+            execute(second.id, runner_func)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+
+        assert run.call_count == 1
+        assert first.results == second.results == {'solution': 3}
+        assert second.status == TaskStatusChoices.DONE
+        assert self.cache.get_stats()['hits'] == 1
+
+    def test_errors_are_not_cached(self):
+        task = self.create_task('cached_add', input={'element1': 'one', 'element2': 2})
+        execute(task.id, runner_func)
+        task.refresh_from_db()
+
+        assert task.status == TaskStatusChoices.ERROR
+        assert self.cache.stats.sets == 0
@@ -0,0 +1,129 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from gonk.exceptions import TaskCancelled
+from gonk.models import Task
+from gonk.settings import TaskStatusChoices
+from gonk.tasks import execute, runner_func
+from test_app.taskrunners import AddTaskRunner
+from test_app.tests.mixins import CreateTaskMixin
+
+
+class TestCooperativeCancellation(TestCase, CreateTaskMixin):
+    def test_pending_task_is_canceled_right_away(self):
+        task = self.create_task()
+
+        assert task.cancel()
+        assert Task.objects.get(id=task.id).status == TaskStatusChoices.CANCELED
+
+    def test_running_task_is_cancelling(self):
+        task = self.create_task(status=TaskStatusChoices.DOING)
+
+        assert task.cancel()
+        assert Task.objects.get(id=task.id).status == TaskStatusChoices.CANCELLING
+
+    def test_terminate_cancels_running_task(self):
+        task = self.create_task(status=TaskStatusChoices.DOING)
+
+        with mock.patch.object(Task, 'revoke') as revoke:
+            assert task.cancel(terminate=True)
+
+        revoke.assert_called_once_with(terminate=True)
+        assert Task.objects.get(id=task.id).status == TaskStatusChoices.CANCELED
+
+    def test_cancelling_again_is_a_no_op(self):
+        task = self.create_task(status=TaskStatusChoices.DOING)
+        assert task.cancel()
+
+        assert not task.cancel()
+        assert Task.objects.get(id=task.id).status == TaskStatusChoices.CANCELLING
+
+        with mock.patch.object(Task, 'revoke'):
+            assert task.cancel(terminate=True)
+        assert Task.objects.get(id=task.id).status == TaskStatusChoices.CANCELED
+
+    def test_finished_task_is_not_canceled(self):
+        task = self.create_task(status=TaskStatusChoices.DONE)
+
+        assert not task.cancel()
+        assert Task.objects.get(id=task.id).status == TaskStatusChoices.DONE
+
+    def test_runner_stops_at_check_cancelled(self):
+        task = self.create_task()
+        steps = []
+
+        def run(runner):
+            for step in range(3):
+                runner.check_cancelled()
+                steps.append(step)
+                Task.objects.get(id=task.id).cancel()
+
+        with mock.patch.object(AddTaskRunner, 'run', autospec=True, side_effect=run), \
+                mock.patch.object(AddTaskRunner, 'cancel_check_interval', 0):
+            execute(task.id, runner_func)
+
+        task.refresh_from_db()
+        assert steps == [0]
+        assert task.status == TaskStatusChoices.CANCELED
+        assert task.finished_on is not None
+        assert task.log_entries.filter(message='TASK CANCELLED').exists()
+
+    def test_task_finishing_after_a_cancel_request_is_canceled(self):
+        task = self.create_task()
+
+        def run(runner):
+            Task.objects.get(id=task.id).cancel()
+            runner.task.results = {'solution': 3}
+
+        with mock.patch.object(AddTaskRunner, 'run', autospec=True, side_effect=run):
+            execute(task.id, runner_func)
+
+        task.refresh_from_db()
+        assert task.status == TaskStatusChoices.CANCELED
+        assert task.results == {}
+
+    def test_task_failing_after_a_cancel_request_is_canceled(self):
+        task = self.create_task(retryable=True)
+
+        def run(runner):
+            Task.objects.get(id=task.id).cancel()
+            raise ValueError('boom')
+
+        with mock.patch.object(AddTaskRunner, 'run', autospec=True, side_effect=run):
+            execute(task.id, runner_func)
+
+        task.refresh_from_db()
+        assert task.status == TaskStatusChoices.CANCELED
+        assert task.retries == 0
+        assert not task.attempts.exists()
+
+    def test_cancel_probe_is_cached(self):
+        task = self.create_task(status=TaskStatusChoices.DOING)
+        runner = task.get_taskrunner()
+
+        with mock.patch.object(AddTaskRunner, 'cancel_check_interval', 60):
+            with self.assertNumQueries(1):
+                assert not runner.should_stop()
+            Task.objects.filter(id=task.id).update(status=TaskStatusChoices.CANCELLING)
+            with self.assertNumQueries(0):
+                runner.check_cancelled()
+
+        with mock.patch.object(AddTaskRunner, 'cancel_check_interval', 0):
+            with self.assertRaises(TaskCancelled):
+                runner.check_cancelled()
+
+    def test_deleted_task_should_stop(self):
+        task = self.create_task(status=TaskStatusChoices.DOING)
+        Task.objects.filter(id=task.id).delete()
+
+        assert task.is_cancel_requested()
+
+    def test_checkpoint_does_not_overwrite_cancelling(self):
+        task = self.create_task(status=TaskStatusChoices.DOING)
+        Task.objects.get(id=task.id).cancel()
+
+        task.log_status('HALFWAY', checkpoint=True)
+
+        assert Task.objects.get(id=task.id).status == TaskStatusChoices.CANCELLING
+        assert task.log_entries.filter(message='HALFWAY').exists()
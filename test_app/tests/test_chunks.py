@@ -0,0 +1,49 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from gonk.models import Task
+from gonk.settings import TaskStatusChoices
+from gonk.tasks import execute, runner_func
+from test_app.taskrunners import ChunkedSumTaskRunner
+from test_app.tests.mixins import CreateTaskMixin, EagerCeleryMixin
+
+
+class TestChunkedTaskRunner(TestCase, CreateTaskMixin, EagerCeleryMixin):
+    def execute(self, task: Task) -> Task:
+        with self.eager(), self.captureOnCommitCallbacks(execute=True):
+            execute(task.id, runner_func)
+
+        return Task.objects.get(id=task.id)
+
+    def test_items_are_processed_in_chunks(self):
+        task = self.execute(self.create_task('chunked_sum', input={'items': [1, 2, 3, 4, 5]}))
+
+        assert task.status == TaskStatusChoices.DONE
+        assert task.results == {'result': 15}
+        chunks = task.children.order_by('id')
+        assert [chunk.input['chunk'] for chunk in chunks] == [[1, 2], [3, 4], [5]]
+        assert [chunk.results['partial'] for chunk in chunks] == [3, 7, 5]
+
+    def test_without_items(self):
+        task = self.execute(self.create_task('chunked_sum', input={'items': []}))
+
+        assert task.status == TaskStatusChoices.DONE
+        assert task.results == {'result': 0}
+
+    def test_failed_chunks_are_retried_alone(self):
+        calls = []
+
+        def process_chunk(runner, chunk):
+            calls.append(chunk)
+            if chunk == [3, 4] and calls.count(chunk) == 1:
+                raise ValueError('flaky chunk')
+            return sum(chunk)
+
+        with mock.patch.object(ChunkedSumTaskRunner, 'process_chunk', autospec=True, side_effect=process_chunk):
+            task = self.execute(self.create_task('chunked_sum', input={'items': [1, 2, 3, 4, 5]}))
+
+        assert sorted(calls) == [[1, 2], [3, 4], [3, 4], [5]]
+        assert task.status == TaskStatusChoices.DONE
+        assert task.results == {'result': 15}
+        assert task.children.get(input__chunk=[3, 4]).retries == 1
@@ -0,0 +1,45 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from gonk.models import Task
+from gonk.taskrunners import TaskRunner
+from test_app.taskrunners import ExpirableWithCleanTaskRunner
+from test_app.tests.mixins import CreateTaskMixin
+
+
+class TestCleanup(TestCase, CreateTaskMixin):
+    def create_expired_tasks(self, task_type, amount):
+        expire_on = timezone.now() - timedelta(days=1)
+        return [self.create_task(task_type, expire_on=expire_on) for _ in range(amount)]
+
+    def test_cleanup_deletes_expired_tasks_in_batches(self):
+        self.create_expired_tasks('add', 5)
+        alive = self.create_task()
+
+        with mock.patch.object(TaskRunner, 'expire') as expire:
+            deleted = Task.cleanup(batch_size=2)
+
+        assert deleted == 5
+        expire.assert_not_called()
+        assert list(Task.objects.values_list('id', flat=True)) == [alive.id]
+
+    def test_cleanup_only_expires_runners_overriding_expire(self):
+        self.create_expired_tasks('expirable_with_func', 3)
+        self.create_expired_tasks('add', 2)
+
+        with mock.patch.object(ExpirableWithCleanTaskRunner, 'expire', autospec=True) as expire:
+            deleted = Task.cleanup(batch_size=2)
+
+        assert deleted == 5
+        assert expire.call_count == 3
+
+    def test_cleanup_stops_when_time_budget_is_exhausted(self):
+        self.create_expired_tasks('add', 5)
+
+        deleted = Task.cleanup(batch_size=2, time_budget=1e-9)
+
+        assert deleted == 2
+        assert Task.objects.count() == 3
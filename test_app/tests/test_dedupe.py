@@ -0,0 +1,153 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from gonk.models import Task
+from gonk.settings import TaskStatusChoices
+from gonk.tasks import to_run
+from test_app.taskrunners import AddTaskRunner
+from test_app.tests.mixins import CreateUserMixin
+
+
+class TestTaskDedupe(TestCase):
+    def test_hash_input_ignores_key_order(self):
+        assert Task.hash_input('add', {'a': 1, 'b': 2}) == Task.hash_input('add', {'b': 2, 'a': 1})
+        assert Task.hash_input('add', {'a': 1}) != Task.hash_input('sub', {'a': 1})
+
+    def test_repeated_submission_returns_existing_task(self):
+        with mock.patch.object(to_run, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                task = Task.create_task('add', {'element1': 1, 'element2': 2}, dedupe_key='order-1')
+            with self.captureOnCommitCallbacks(execute=True):
+                duplicate = Task.create_task('add', {'element1': 1, 'element2': 2}, dedupe_key='order-1')
+
+        assert duplicate.id == task.id
+        assert Task.objects.count() == 1
+        apply_async.assert_called_once()
+
+    def test_key_is_released_after_the_window(self):
+        with mock.patch.object(to_run, 'apply_async'):
+            task = Task.create_task('add', {'element1': 1, 'element2': 2}, dedupe_key='order-1')
+            Task.objects.filter(id=task.id).update(created=timezone.now() - timedelta(days=1))
+
+            new_task = Task.create_task('add', {'element1': 1, 'element2': 2}, dedupe_key='order-1')
+
+        assert new_task.id != task.id
+        assert Task.objects.get(id=task.id).dedupe_key is None
+        assert Task.objects.get(id=new_task.id).dedupe_key == 'order-1'
+
+    def test_concurrent_submission_returns_the_winner(self):
+        with mock.patch.object(to_run, 'apply_async'):
+            task = Task.create_task('add', {'element1': 1, 'element2': 2}, dedupe_key='order-1')
+
+            with mock.patch.object(Task, 'get_duplicates', return_value={}):
+                duplicate = Task.create_task('add', {'element1': 1, 'element2': 2}, dedupe_key='order-1')
+
+        assert duplicate.id == task.id
+        assert Task.objects.count() == 1
+
+    def test_deduplicating_runner_uses_the_input_hash(self):
+        with mock.patch.object(AddTaskRunner, 'deduplicate', True), mock.patch.object(to_run, 'apply_async'):
+            task = Task.create_task('add', {'element1': 1, 'element2': 2})
+            duplicate = Task.create_task('add', {'element2': 2, 'element1': 1})
+            other = Task.create_task('add', {'element1': 2, 'element2': 2})
+
+        assert task.dedupe_key == task.input_hash
+        assert duplicate.id == task.id
+        assert other.id != task.id
+
+    def test_keys_are_scoped_to_the_user(self):
+        task_input = {'element1': 1, 'element2': 2}
+        with mock.patch.object(AddTaskRunner, 'deduplicate', True), mock.patch.object(to_run, 'apply_async'):
+            alice = Task.create_task('add', task_input, username='alice')
+            bob = Task.create_task('add', task_input, username='bob')
+            alice_order = Task.create_task('add', task_input, username='alice', dedupe_key='order-1')
+            bob_order = Task.create_task('add', task_input, username='bob', dedupe_key='order-1')
+
+        assert bob.id != alice.id
+        assert bob.username == 'bob'
+        assert bob_order.id != alice_order.id
+        assert bob_order.username == 'bob'
+
+        tasks = Task.create_tasks([
+            {'task_type': 'add', 'task_input': task_input, 'username': 'alice', 'dedupe_key': 'order-1'},
+            {'task_type': 'add', 'task_input': task_input, 'username': 'carol', 'dedupe_key': 'order-1'},
+        ])
+        assert tasks[0].id == alice_order.id
+        assert tasks[1].username == 'carol'
+        assert Task.objects.filter(dedupe_key='order-1').count() == 3
+
+    def test_concurrent_bulk_creation_returns_the_winners(self):
+        with mock.patch.object(to_run, 'apply_async'):
+            task = Task.create_task('add', {'element1': 1, 'element2': 2}, dedupe_key='order-1')
+
+        get_duplicates = Task.get_duplicates
+        with mock.patch.object(Task, 'get_duplicates', side_effect=[{}, get_duplicates([('', 'order-1')])]):
+            tasks = Task.create_tasks([
+                {'task_type': 'add', 'task_input': {'element1': 1, 'element2': 2}, 'dedupe_key': 'order-1'},
+                {'task_type': 'add', 'task_input': {'element1': 1, 'element2': 2}, 'dedupe_key': 'order-2'},
+            ])
+
+        assert tasks[0].id == task.id
+        assert Task.objects.get(id=tasks[1].id).dedupe_key == 'order-2'
+        assert Task.objects.count() == 2
+
+    def test_bulk_creation_skips_duplicates(self):
+        with mock.patch.object(to_run, 'apply_async'):
+            task = Task.create_task('add', {'element1': 1, 'element2': 2}, dedupe_key='order-1')
+
+        tasks = Task.create_tasks([
+            {'task_type': 'add', 'task_input': {'element1': 1, 'element2': 2}, 'dedupe_key': 'order-1'},
+            {'task_type': 'add', 'task_input': {'element1': 1, 'element2': 2}, 'dedupe_key': 'order-2'},
+            {'task_type': 'add', 'task_input': {'element1': 1, 'element2': 2}, 'dedupe_key': 'order-2'},
+        ])
+
+        assert tasks[0].id == task.id
+        assert tasks[1] is tasks[2]
+        assert Task.objects.count() == 2
+
+    def test_results_are_reused_within_ttl(self):
+        with mock.patch.object(AddTaskRunner, 'results_ttl', timedelta(minutes=5)), \
+                mock.patch.object(to_run, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                task = Task.create_task('add', {'element1': 1, 'element2': 2})
+            task.transition(TaskStatusChoices.DONE, finished_on=timezone.now(), results={'solution': 3})
+
+            with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(5):
+                reused = Task.create_task('add', {'element2': 2, 'element1': 1})
+
+        assert reused.id != task.id
+        assert reused.status == TaskStatusChoices.DONE
+        assert Task.objects.get(id=reused.id).results == {'solution': 3}
+        assert reused.log_entries.get().message == f'RESULTS REUSED FROM TASK {task.id}'
+        apply_async.assert_called_once()
+
+    def test_results_are_not_reused_after_ttl(self):
+        with mock.patch.object(AddTaskRunner, 'results_ttl', timedelta(minutes=5)), \
+                mock.patch.object(to_run, 'apply_async'):
+            task = Task.create_task('add', {'element1': 1, 'element2': 2})
+            task.transition(TaskStatusChoices.DONE, finished_on=timezone.now() - timedelta(minutes=10))
+
+            new_task = Task.create_task('add', {'element1': 1, 'element2': 2})
+
+        assert new_task.status == TaskStatusChoices.PENDING
+
+
+class TestTaskDedupeApi(APITestCase, CreateUserMixin):
+    def test_create_with_dedupe_key(self):
+        user = self.create_user('kenobi@starwars.com', 'ihavethehighground')
+        self.add_permission(user, 'can_create_task')
+        self.client.force_authenticate(user=user)
+        data = {'task_type': 'add', 'task_input': {'element1': 0, 'element2': 3}, 'dedupe_key': 'order-1'}
+
+        with mock.patch.object(to_run, 'apply_async'):
+            first = self.client.post('/tasks/', data=json.dumps(data), content_type='application/json')
+            second = self.client.post('/tasks/', data=json.dumps(data), content_type='application/json')
+
+        assert second.status_code == status.HTTP_201_CREATED
+        assert first.data['id'] == second.data['id']
@@ -0,0 +1,119 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from celery import group
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from gonk.fair_share import fair_share, percentile
+from gonk.models import Task
+from gonk.registry import REGISTRY
+from gonk.settings import TaskStatusChoices
+from gonk.tasks import to_run
+
+
+class TestFairShare(TestCase):
+    def test_fair_share(self):
+        assert fair_share(6, {'vader': 10, 'kenobi': 2}) == {'vader': 4, 'kenobi': 2}
+        assert fair_share(5, {'vader': 10, 'kenobi': 10}) == {'kenobi': 3, 'vader': 2}
+        assert fair_share(0, {'vader': 10}) == {'vader': 0}
+        assert fair_share(10, {'vader': 1, 'kenobi': 0}) == {'vader': 1, 'kenobi': 0}
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([3], 99) == 3
+
+    def test_priority_is_sent_to_the_broker(self):
+        with mock.patch.object(to_run, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                task = Task.create_task('add', {'element1': 1, 'element2': 2}, priority=9)
+
+        assert apply_async.call_args.kwargs['priority'] == 9
+        assert task.dispatched_on is not None
+
+    @mock.patch('gonk.models.FAIR_SHARE', True)
+    def test_pending_tasks_are_released_fairly(self):
+        with mock.patch.object(to_run, 'apply_async') as apply_async:
+            Task.create_tasks(
+                {'task_type': 'add', 'task_input': {'element1': i, 'element2': 0}, 'username': 'vader',
+                 'priority': 5 if i >= 8 else 0}
+                for i in range(10)
+            )
+            for i in range(2):
+                Task.create_task('add', {'element1': i, 'element2': 0}, username='kenobi')
+        apply_async.assert_not_called()
+        assert not Task.objects.filter(dispatched_on__isnull=False).exists()
+
+        with mock.patch.object(group, 'apply_async', autospec=True) as group_apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                assert Task.release_pending(queue_limit=6, user_limit=5) == 6
+
+        released = Task.objects.filter(dispatched_on__isnull=False)
+        assert released.filter(username='kenobi').count() == 2
+        assert sorted(released.filter(username='vader').values_list('input__element1', flat=True)) == [0, 1, 8, 9]
+        signatures = group_apply_async.call_args.args[0].tasks
+        assert {s.options['task_id'] for s in signatures} == set(released.values_list('celery_id', flat=True))
+
+        with mock.patch.object(group, 'apply_async', autospec=True):
+            assert Task.release_pending(queue_limit=6, user_limit=5) == 0
+
+        Task.objects.filter(username='kenobi').update(status=TaskStatusChoices.DONE)
+        with mock.patch.object(group, 'apply_async', autospec=True):
+            assert Task.release_pending(queue_limit=6, user_limit=5) == 1
+
+    @mock.patch('gonk.models.FAIR_SHARE', True)
+    def test_scheduled_tasks_are_not_held(self):
+        with mock.patch.object(to_run, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                Task.create_task('add', {'element1': 1, 'element2': 0}, eta=timezone.now() + timedelta(hours=1))
+
+        apply_async.assert_called_once()
+
+    @mock.patch('gonk.models.FAIR_SHARE', True)
+    def test_scheduled_tasks_are_not_in_flight_until_due(self):
+        tomorrow = timezone.now() + timedelta(days=1)
+        with mock.patch.object(to_run, 'apply_async'):
+            for i in range(3):
+                Task.create_task('add', {'element1': i, 'element2': 0}, username='vader', eta=tomorrow)
+            Task.create_task('add', {'element1': 3, 'element2': 0}, username='vader')
+
+        assert Task.objects.filter(dispatched_on=tomorrow).count() == 3
+        with mock.patch.object(group, 'apply_async', autospec=True):
+            assert Task.release_pending(queue_limit=10, user_limit=3) == 1
+
+
+class TestWaitReport(TestCase):
+    def test_wait_report(self):
+        now = timezone.now()
+        for i in range(1, 101):
+            task = Task.objects.create(runner_path=REGISTRY.registry['add'], username='vader')
+            Task.objects.filter(id=task.id).update(created=now - timedelta(seconds=i), started_on=now)
+
+        report = Task.objects.wait_report(now - timedelta(minutes=1))
+
+        assert len(report) == 1
+        assert report[0]['count'] == 100
+        assert round(report[0]['p99']) == 99
+        assert round(report[0]['max']) == 100
+
+        out = StringIO()
+        call_command('report_task_wait', '--minutes=5', stdout=out)
+        assert 'vader' in out.getvalue()
+
+    def test_wait_report_counts_from_the_due_time(self):
+        now = timezone.now()
+        scheduled = Task.objects.create(runner_path=REGISTRY.registry['add'], username='vader')
+        retried = Task.objects.create(runner_path=REGISTRY.registry['add'], username='vader')
+        Task.objects.filter(id=scheduled.id).update(
+            created=now - timedelta(hours=1), dispatched_on=now - timedelta(seconds=2), started_on=now,
+        )
+        Task.objects.filter(id=retried.id).update(created=now - timedelta(hours=1), started_on=now, retries=1)
+
+        report = Task.objects.wait_report(now - timedelta(minutes=1))
+
+        assert report[0]['count'] == 1
+        assert round(report[0]['max']) == 2
@@ -0,0 +1,193 @@
+import json
+from unittest import mock
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from gonk.models import Task
+from gonk.settings import TaskStatusChoices
+from gonk.tasks import execute, finish, reducer_func, runner_func, to_reduce, to_retry
+from test_app.tests.mixins import CreateTaskMixin, CreateUserMixin, EagerCeleryMixin
+
+
+class TestTaskGraphs(APITestCase, CreateUserMixin, CreateTaskMixin, EagerCeleryMixin):
+    def create_parent(self, pairs: list, **kwargs) -> Task:
+        return self.create_task('sum', input={'pairs': pairs}, username='kenobi', **kwargs)
+
+    def test_children_are_reduced_into_the_parent(self):
+        parent = self.create_parent([{'element1': 1, 'element2': 2}, {'element1': 3, 'element2': 4}])
+
+        with self.eager():
+            with self.captureOnCommitCallbacks(execute=True):
+                execute(parent.id, runner_func)
+
+        parent.refresh_from_db()
+        assert parent.status == TaskStatusChoices.DONE
+        assert parent.results == {'solution': 10}
+        assert parent.finished_on is not None
+        children = list(parent.children.all())
+        assert len(children) == 2
+        assert all(child.username == 'kenobi' and child.status == TaskStatusChoices.DONE for child in children)
+
+    def test_parent_waits_for_pending_children(self):
+        parent = self.create_parent([{'element1': 1, 'element2': 2}, {'element1': 3, 'element2': 4}])
+
+        with mock.patch.object(to_reduce, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=False):
+                execute(parent.id, runner_func)
+            first, second = parent.children.all()
+
+            assert Task.objects.get(id=parent.id).status == TaskStatusChoices.WAITING
+            with self.assertNumQueries(1):
+                assert parent.get_progress() == {'total': 2, 'done': 0, 'pending': 2, 'failed': 0}
+
+            with self.captureOnCommitCallbacks(execute=True):
+                execute(first.id, runner_func)
+            apply_async.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                execute(second.id, runner_func)
+            apply_async.assert_called_once_with(kwargs={'task_id': parent.id}, queue=parent.queue)
+
+    def test_children_decrement_the_pending_counter(self):
+        parent = self.create_parent([{'element1': i, 'element2': 0} for i in range(3)])
+
+        with mock.patch.object(to_reduce, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=False):
+                execute(parent.id, runner_func)
+            first, second, third = parent.children.order_by('id')
+            assert Task.objects.get(id=parent.id).pending_children == 3
+
+            # A retried child is still pending
+            Task.objects.filter(id=first.id).update(retryable=True)
+            with mock.patch('test_app.taskrunners.AddTaskRunner.run', side_effect=ValueError('boom')), \
+                    mock.patch.object(to_retry, 'apply_async'):
+                execute(first.id, runner_func)
+            assert Task.objects.get(id=parent.id).pending_children == 3
+
+            # SELECT, UPDATE to DOING, INSERT log entries, UPDATE to DONE, decrement the parent
+            with self.assertNumQueries(5), self.captureOnCommitCallbacks(execute=True):
+                execute(second.id, runner_func)
+            assert Task.objects.get(id=parent.id).pending_children == 2
+
+            Task.objects.filter(id=first.id).update(status=TaskStatusChoices.DONE)
+            Task.objects.get(id=first.id).notify_parent()
+            with self.captureOnCommitCallbacks(execute=True):
+                execute(third.id, runner_func)
+
+        assert Task.objects.get(id=parent.id).pending_children == 0
+        apply_async.assert_called_once_with(kwargs={'task_id': parent.id}, queue=parent.queue)
+
+    def test_children_finished_before_the_parent_waits(self):
+        parent = self.create_parent([])
+        Task.objects.filter(id=parent.id).update(status=TaskStatusChoices.DOING)
+        parent.refresh_from_db()
+
+        with mock.patch.object(to_reduce, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=False):
+                children = parent.spawn('add', [{'element1': 1, 'element2': 2}, {'element1': 3, 'element2': 4}])
+            assert Task.objects.get(id=parent.id).pending_children == 2
+
+            for child in children:
+                with self.captureOnCommitCallbacks(execute=True):
+                    execute(child.id, runner_func)
+            assert Task.objects.get(id=parent.id).pending_children == 0
+            apply_async.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                finish(parent, TaskStatusChoices.DOING)
+
+        assert Task.objects.get(id=parent.id).status == TaskStatusChoices.WAITING
+        apply_async.assert_called_once_with(kwargs={'task_id': parent.id}, queue=parent.queue)
+
+    def test_pending_counter_does_not_go_negative(self):
+        parent = self.create_parent([])
+        Task.objects.filter(id=parent.id).update(pending_children=1)
+
+        Task.schedule_reduce(parent.id, finished=3)
+
+        assert Task.objects.get(id=parent.id).pending_children == 0
+
+    def test_failed_reduce_is_retried(self):
+        parent = self.create_parent([], status=TaskStatusChoices.WAITING, retryable=True, max_retries=1)
+        self.create_task(parent=parent, status=TaskStatusChoices.ERROR)
+
+        with mock.patch.object(to_retry, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                execute(parent.id, reducer_func)
+
+        parent.refresh_from_db()
+        assert parent.status == TaskStatusChoices.ERROR
+        apply_async.assert_called_once()
+        assert apply_async.call_args.kwargs['task_id'] == parent.celery_id
+
+    def test_failed_reduce_notifies_the_grandparent(self):
+        grandparent = self.create_parent([], status=TaskStatusChoices.WAITING, pending_children=1)
+        parent = self.create_parent([], parent=grandparent, status=TaskStatusChoices.WAITING)
+        self.create_task(parent=parent, status=TaskStatusChoices.ERROR)
+
+        with mock.patch.object(to_reduce, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                execute(parent.id, reducer_func)
+
+        assert Task.objects.get(id=parent.id).status == TaskStatusChoices.ERROR
+        apply_async.assert_called_once_with(kwargs={'task_id': grandparent.id}, queue=grandparent.queue)
+
+    def test_reduce_runs_once(self):
+        parent = self.create_parent([{'element1': 1, 'element2': 2}])
+        Task.objects.filter(id=parent.id).update(status=TaskStatusChoices.WAITING)
+        self.create_task(parent=parent, status=TaskStatusChoices.DONE, results={'solution': 3})
+
+        with mock.patch('test_app.taskrunners.SumTaskRunner.reduce') as reduce:
+            execute(parent.id, reducer_func)
+            execute(parent.id, reducer_func)
+
+        reduce.assert_called_once()
+        assert Task.objects.get(id=parent.id).status == TaskStatusChoices.DONE
+
+    def test_failed_children_fail_the_parent(self):
+        parent = self.create_parent([{'element1': 1, 'element2': 2}, {'element1': 3, 'element2': 4}])
+
+        def run(runner):
+            if runner.task.input['element1'] == 3:
+                raise ValueError('element1 is 3')
+
+        with self.eager(), \
+                mock.patch('test_app.taskrunners.AddTaskRunner.run', autospec=True, side_effect=run):
+            with self.captureOnCommitCallbacks(execute=True):
+                execute(parent.id, runner_func)
+
+        parent.refresh_from_db()
+        assert parent.status == TaskStatusChoices.ERROR
+        assert parent.get_progress() == {'total': 2, 'done': 1, 'pending': 0, 'failed': 1}
+
+    def test_cancelling_the_last_pending_child_reduces_the_parent(self):
+        parent = self.create_parent([])
+        Task.objects.filter(id=parent.id).update(status=TaskStatusChoices.WAITING)
+        self.create_task(parent=parent, status=TaskStatusChoices.DONE)
+        child = self.create_task(parent=parent)
+        running = self.create_task(parent=parent, status=TaskStatusChoices.DOING)
+
+        with mock.patch.object(Task, 'revoke'), mock.patch.object(to_reduce, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                assert running.cancel(terminate=True)
+                assert child.cancel()
+
+        apply_async.assert_called_once_with(kwargs={'task_id': parent.id}, queue=parent.queue)
+        assert parent.get_progress() == {'total': 3, 'done': 1, 'pending': 0, 'failed': 2}
+
+    def test_retryable_failed_children_are_pending(self):
+        parent = self.create_parent([])
+        self.create_task(parent=parent, status=TaskStatusChoices.ERROR, retryable=True, retries=0, max_retries=1)
+
+        assert parent.get_progress()['pending'] == 1
+
+    def test_progress_endpoint(self):
+        user = self.create_user('kenobi', 'ihavethehighground')
+        self.client.force_authenticate(user=user)
+        parent = self.create_parent([])
+        self.create_task(parent=parent, status=TaskStatusChoices.DONE)
+
+        response = self.client.get(f'/tasks/{parent.id}/progress/')
+        assert response.status_code == status.HTTP_200_OK
+        assert json.loads(response.content) == {'total': 1, 'done': 1, 'pending': 0, 'failed': 0}
@@ -0,0 +1,80 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from gonk.models import Task
+from gonk.settings import TaskStatusChoices
+from gonk.tasks import execute, reap_gonk_tasks, runner_func, to_reduce, to_retry
+from test_app.taskrunners import AddTaskRunner
+from test_app.tests.mixins import CreateTaskMixin
+
+
+class TestHeartbeat(TestCase, CreateTaskMixin):
+    def test_run_sets_heartbeat(self):
+        task = self.create_task()
+        heartbeats = []
+
+        def run(runner):
+            heartbeats.append(Task.objects.get(id=task.id).heartbeat)
+
+        with mock.patch.object(AddTaskRunner, 'run', autospec=True, side_effect=run):
+            execute(task.id, runner_func)
+
+        assert heartbeats[0] is not None
+
+    def test_checkpoints_refresh_heartbeat_at_most_once_per_interval(self):
+        old = timezone.now() - timedelta(minutes=5)
+        task = self.create_task(status=TaskStatusChoices.DOING, heartbeat=old)
+
+        task.log_status('STEP 1', checkpoint=True)
+        heartbeat = Task.objects.get(id=task.id).heartbeat
+        assert heartbeat > old
+
+        task.log_status('STEP 2', checkpoint=True)
+        assert Task.objects.get(id=task.id).heartbeat == heartbeat
+
+    def test_fresh_tasks_are_not_reaped(self):
+        task = self.create_task(status=TaskStatusChoices.DOING, heartbeat=timezone.now())
+
+        self.reap()
+
+        assert Task.objects.get(id=task.id).status == TaskStatusChoices.DOING
+
+    def reap(self):
+        with mock.patch('gonk.tasks.STALE_TIMEOUT', 60):
+            with self.captureOnCommitCallbacks(execute=True):
+                reap_gonk_tasks()
+
+    def test_stale_task_fails_and_is_retried(self):
+        stale = timezone.now() - timedelta(minutes=5)
+        task = self.create_task(status=TaskStatusChoices.DOING, heartbeat=stale, retryable=True)
+        running = self.create_task(status=TaskStatusChoices.DOING, heartbeat=timezone.now())
+
+        with mock.patch.object(to_retry, 'apply_async') as apply_async:
+            self.reap()
+
+        task.refresh_from_db()
+        assert task.status == TaskStatusChoices.ERROR
+        assert 'Worker lost' in task.results['exception']
+        assert task.attempts.get().status == TaskStatusChoices.ERROR
+        apply_async.assert_called_once()
+        assert Task.objects.get(id=running.id).status == TaskStatusChoices.DOING
+
+    def test_stale_cancelling_task_is_cancelled(self):
+        task = self.create_task(status=TaskStatusChoices.CANCELLING, heartbeat=timezone.now() - timedelta(minutes=5))
+
+        self.reap()
+
+        assert Task.objects.get(id=task.id).status == TaskStatusChoices.CANCELED
+
+    def test_stale_reducing_task_is_reduced_again(self):
+        task = self.create_task('sum', status=TaskStatusChoices.REDUCING,
+                                heartbeat=timezone.now() - timedelta(minutes=5))
+
+        with mock.patch.object(to_reduce, 'apply_async') as apply_async:
+            self.reap()
+
+        assert Task.objects.get(id=task.id).status == TaskStatusChoices.WAITING
+        apply_async.assert_called_once()
@@ -0,0 +1,73 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from gonk.models import Task, TaskRunnerLimit
+from gonk.settings import TaskStatusChoices
+from gonk.tasks import execute, runner_func, to_run
+from test_app.taskrunners import AddTaskRunner
+from test_app.tests.mixins import CreateTaskMixin
+
+
+class TestTaskRunnerLimits(TestCase, CreateTaskMixin):
+    def execute(self, task: Task):
+        with mock.patch.object(to_run, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                execute(task.id, runner_func)
+
+        return apply_async
+
+    def test_unlimited_runners_do_not_touch_the_limiter(self):
+        self.execute(self.create_task())
+
+        assert not TaskRunnerLimit.objects.exists()
+
+    @mock.patch.object(AddTaskRunner, 'max_concurrency', 1)
+    def test_tasks_over_max_concurrency_are_deferred(self):
+        self.create_task(status=TaskStatusChoices.DOING)
+        task = self.create_task()
+
+        started = timezone.now()
+        apply_async = self.execute(task)
+
+        task.refresh_from_db()
+        assert task.status == TaskStatusChoices.PENDING
+        apply_async.assert_called_once()
+        assert apply_async.call_args.kwargs['kwargs'] == {'task_id': task.id}
+        assert apply_async.call_args.kwargs['eta'] >= started + timedelta(seconds=1)
+
+        Task.objects.filter(status=TaskStatusChoices.DOING).update(status=TaskStatusChoices.DONE)
+        apply_async = self.execute(task)
+
+        assert Task.objects.get(id=task.id).status == TaskStatusChoices.DONE
+        apply_async.assert_not_called()
+
+    @mock.patch.object(AddTaskRunner, 'max_concurrency', 1)
+    def test_cancelling_tasks_count_as_running(self):
+        self.create_task(status=TaskStatusChoices.CANCELLING)
+        task = self.create_task()
+
+        apply_async = self.execute(task)
+
+        assert Task.objects.get(id=task.id).status == TaskStatusChoices.PENDING
+        apply_async.assert_called_once()
+
+    @mock.patch.object(AddTaskRunner, 'rate_limit', 2)
+    def test_rate_limit(self):
+        tasks = [self.create_task() for _ in range(3)]
+        now = timezone.now()
+
+        with mock.patch('gonk.models.timezone.now', return_value=now):
+            for task in tasks:
+                self.execute(task)
+
+        statuses = [Task.objects.get(id=task.id).status for task in tasks]
+        assert statuses == [TaskStatusChoices.DONE, TaskStatusChoices.DONE, TaskStatusChoices.PENDING]
+
+        with mock.patch('gonk.models.timezone.now', return_value=now + timedelta(seconds=0.5)):
+            self.execute(tasks[2])
+
+        assert Task.objects.get(id=tasks[2].id).status == TaskStatusChoices.DONE
+        assert TaskRunnerLimit.objects.get(runner_path=tasks[2].runner_path).tokens == 0
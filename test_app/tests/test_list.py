@@ -0,0 +1,54 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from gonk.settings import TaskStatusChoices
+from test_app.tests.mixins import CreateTaskMixin, CreateUserMixin
+
+
+class TestListTasks(APITestCase, CreateUserMixin, CreateTaskMixin):
+    def setUp(self) -> None:
+        self.username = 'kenobi@starwars.com'
+        self.user = self.create_user(self.username, 'ihavethehighground')
+        self.client.force_authenticate(user=self.user)
+        self.task_defaults = {'username': self.username}
+
+    def test_list_is_cursor_paginated_newest_first(self):
+        tasks = [self.create_task() for _ in range(5)]
+
+        response = self.client.get('/tasks/?page_size=2')
+        assert response.status_code == status.HTTP_200_OK
+        assert [t['id'] for t in response.data['results']] == [tasks[4].id, tasks[3].id]
+
+        ids = [t['id'] for t in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            ids += [t['id'] for t in response.data['results']]
+
+        assert ids == [t.id for t in reversed(tasks)]
+
+    def test_list_only_loads_serialized_fields(self):
+        self.create_task(log='a long log', input={'a': 1}, results={'b': 2})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/tasks/?page_size=10')
+
+        assert response.status_code == status.HTTP_200_OK
+        sql = queries.captured_queries[-1]['sql']
+        for blob in ('"log"', '"input"', '"results"'):
+            assert blob not in sql
+
+    def test_list_filters(self):
+        done = self.create_task(status=TaskStatusChoices.DONE)
+        error = self.create_task(status=TaskStatusChoices.ERROR, queue='slow')
+        sleep = self.create_task('sleep')
+
+        response = self.client.get(f'/tasks/?status={TaskStatusChoices.DONE},{TaskStatusChoices.ERROR}')
+        assert {t['id'] for t in response.data} == {done.id, error.id}
+
+        response = self.client.get('/tasks/?queue=slow')
+        assert [t['id'] for t in response.data] == [error.id]
+
+        response = self.client.get('/tasks/?task_type=sleep')
+        assert [t['id'] for t in response.data] == [sleep.id]
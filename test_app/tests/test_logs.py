@@ -0,0 +1,83 @@
+from unittest import mock
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from gonk.models import Task, TaskLogEntry
+from gonk.registry import REGISTRY
+from gonk.settings import TaskStatusChoices, TaskLogLevelChoices
+from gonk.tasks import execute, runner_func
+from test_app.tests.mixins import CreateUserMixin
+
+
+class TestTaskLog(APITestCase, CreateUserMixin):
+    def setUp(self) -> None:
+        self.username = 'kenobi@starwars.com'
+        self.user = self.create_user(self.username, 'ihavethehighground')
+        self.task = Task.objects.create(runner_path=REGISTRY.registry['add'], username=self.username)
+
+    def test_log_entries_are_buffered_until_the_task_is_saved(self):
+        self.task.log_status('first')
+        self.task.log_status('second', level=TaskLogLevelChoices.WARNING)
+        assert TaskLogEntry.objects.count() == 0
+
+        with self.assertNumQueries(2):
+            self.task.save(update_fields=['status'])
+
+        entries = list(self.task.log_entries.values_list('message', 'level'))
+        assert entries == [('first', TaskLogLevelChoices.INFO), ('second', TaskLogLevelChoices.WARNING)]
+
+    def test_log_entries_are_written_once_the_buffer_is_full(self):
+        with mock.patch('gonk.models.LOG_BUFFER_SIZE', 2):
+            self.task.log_status('first')
+            assert TaskLogEntry.objects.count() == 0
+
+            with self.assertNumQueries(1):
+                self.task.log_status('second')
+
+        assert list(self.task.log_entries.values_list('message', flat=True)) == ['first', 'second']
+
+    def test_log_entries_after_the_last_transition_are_written(self):
+        def notify_parent(task):
+            task.log_status('PARENT NOTIFIED')
+
+        with mock.patch.object(Task, 'notify_parent', autospec=True, side_effect=notify_parent):
+            execute(self.task.id, runner_func)
+
+        assert self.task.log_entries.filter(message='PARENT NOTIFIED').exists()
+
+    def test_checkpoint_only_updates_status(self):
+        self.task.status = TaskStatusChoices.DOING
+        self.task.results = {'not': 'saved'}
+
+        with self.assertNumQueries(2):
+            self.task.log_status('checkpoint', checkpoint=True)
+
+        task = Task.objects.get(id=self.task.id)
+        assert task.status == TaskStatusChoices.DOING
+        assert task.results == {}
+        assert task.log_entries.get().status == TaskStatusChoices.DOING
+
+    def test_retrieve_and_paginated_logs(self):
+        for i in range(3):
+            self.task.log_status(f'line {i}')
+        self.task.log_status('done', checkpoint=True)
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(f'/tasks/{self.task.id}/')
+        assert response.status_code == status.HTTP_200_OK
+        assert 'line 0' in response.data['log']
+        assert 'Status:' in response.data['log']
+
+        with mock.patch('gonk.contrib.rest_framework.serializers.LOG_TAIL_SIZE', 2):
+            response = self.client.get(f'/tasks/{self.task.id}/')
+        assert 'line 1' not in response.data['log']
+        assert response.data['log'].index('line 2') < response.data['log'].index('done')
+
+        response = self.client.get(f'/tasks/{self.task.id}/logs/?page_size=2')
+        assert response.status_code == status.HTTP_200_OK
+        assert [e['message'] for e in response.data['results']] == ['line 0', 'line 1']
+
+        response = self.client.get(response.data['next'])
+        assert [e['message'] for e in response.data['results']] == ['line 2', 'done']
+        assert response.data['next'] is None
@@ -0,0 +1,142 @@
+import threading
+from time import sleep
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs
+
+from django.test import SimpleTestCase
+
+from gonk.contrib.notifications.publisher import MercurePublisher
+
+JWT_KEY = 'a-mercure-key-long-enough-for-hs256'
+
+
+class StubHubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+        self.server.received.append({
+            'data': parse_qs(body),
+            'authorization': self.headers['Authorization'],
+            'client': self.client_address,
+        })
+        self.server.release.wait(5)
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class StubHubMixin:
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHubHandler)
+        self.server.received = []
+        self.server.release = threading.Event()
+        self.server.release.set()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.hub_url = f'http://127.0.0.1:{self.server.server_port}/.well-known/mercure'
+
+    def tearDown(self):
+        self.server.release.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestMercurePublisher(StubHubMixin, SimpleTestCase):
+    def test_events_are_published_over_reused_connections(self):
+        publisher = MercurePublisher(self.hub_url, JWT_KEY, workers=2)
+
+        for i in range(20):
+            publisher.publish(f'topic-{i}', ['user'], f'event {i}')
+        publisher.flush()
+        publisher.stop()
+
+        assert len(self.server.received) == 20
+        assert len({request['client'] for request in self.server.received}) <= 2
+        assert publisher.get_stats()['published'] == 20
+
+    def test_bursts_to_the_same_topic_are_coalesced(self):
+        publisher = MercurePublisher(self.hub_url, JWT_KEY, workers=1)
+        self.server.release.clear()
+
+        publisher.publish('blocker', ['user'], 'blocker')
+        for i in range(10):
+            publisher.publish('progress', ['user'], f'{i * 10}%')
+        self.server.release.set()
+        publisher.flush()
+        publisher.stop()
+
+        progress = [r['data']['data'][0] for r in self.server.received if r['data']['topic'] == ['progress']]
+        assert progress == ['90%']
+        assert publisher.get_stats()['coalesced'] == 9
+
+    def test_full_queue_drops_events(self):
+        publisher = MercurePublisher(self.hub_url, JWT_KEY, workers=1, queue_size=2)
+
+        with mock.patch.object(publisher, 'start'):
+            assert publisher.publish('topic-1', ['user'], 'event')
+            assert publisher.publish('topic-2', ['user'], 'event')
+            assert not publisher.publish('topic-3', ['user'], 'event')
+
+        stats = publisher.get_stats()
+        assert stats['dropped'] == 1
+        assert stats['backlog'] == 2
+
+    def test_jwt_tokens_are_cached_per_target_set(self):
+        publisher = MercurePublisher(self.hub_url, JWT_KEY, workers=1)
+
+        with mock.patch('gonk.contrib.notifications.mercure.get_jwt_token', return_value='token') as get_jwt_token:
+            for i in range(5):
+                publisher.publish(f'topic-{i}', ['user', 'topic'], 'event')
+            publisher.flush()
+            publisher.stop()
+
+        get_jwt_token.assert_called_once()
+        assert {r['authorization'] for r in self.server.received} == {'Bearer token'}
+
+    def test_jwt_token_cache_is_bounded(self):
+        publisher = MercurePublisher(self.hub_url, JWT_KEY, workers=1, jwt_ttl=10, jwt_cache_size=3)
+
+        with mock.patch('gonk.contrib.notifications.publisher.monotonic', return_value=0):
+            for i in range(1000):
+                publisher.get_token([f'topic-{i}', 'user'])
+        assert list(publisher.tokens) == [frozenset([f'topic-{i}', 'user']) for i in range(997, 1000)]
+
+        with mock.patch('gonk.contrib.notifications.publisher.monotonic', return_value=10):
+            publisher.get_token(['topic', 'user'])
+        assert list(publisher.tokens) == [frozenset(['topic', 'user'])]
+
+
+class TestBatchedMercurePublisher(StubHubMixin, SimpleTestCase):
+    def test_events_are_gathered_per_window(self):
+        publisher = MercurePublisher(self.hub_url, JWT_KEY, workers=2, batch_window=50)
+
+        for i in range(10):
+            publisher.publish('progress', ['user'], f'{i * 10}%')
+            publisher.publish(f'topic-{i}', ['user'], 'event')
+        publisher.flush()
+        publisher.stop()
+
+        progress = [r['data']['data'][0] for r in self.server.received if r['data']['topic'] == ['progress']]
+        assert progress == ['90%']
+        assert len(self.server.received) == 11
+
+    def test_rate_limited_topics_only_keep_their_latest_event(self):
+        publisher = MercurePublisher(self.hub_url, JWT_KEY, workers=1, batch_window=10, topic_rate_limit=4)
+
+        publisher.publish('progress', ['user'], '0%')
+        publisher.flush()
+        for i in range(1, 10):
+            publisher.publish('progress', ['user'], f'{i * 10}%')
+        sleep(0.1)
+        assert len(self.server.received) == 1
+
+        publisher.flush()
+        publisher.stop()
+
+        progress = [r['data']['data'][0] for r in self.server.received]
+        assert progress == ['0%', '90%']
+        assert publisher.get_stats()['rate_limited'] > 0
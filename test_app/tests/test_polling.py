@@ -0,0 +1,142 @@
+from datetime import timedelta
+from time import monotonic
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from gonk.models import Task
+from gonk.polling import await_changes
+from gonk.registry import REGISTRY
+from gonk.settings import POLL_MARGIN, TaskStatusChoices
+from test_app.tests.mixins import CreateUserMixin
+
+
+class TestTaskPolling(APITestCase, CreateUserMixin):
+    def setUp(self) -> None:
+        self.username = 'kenobi@starwars.com'
+        self.user = self.create_user(self.username, 'ihavethehighground')
+        self.client.force_authenticate(user=self.user)
+        self.task = Task.objects.create(runner_path=REGISTRY.registry['add'], username=self.username)
+
+    def test_retrieve_supports_conditional_requests(self):
+        response = self.client.get(f'/tasks/{self.task.id}/')
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/tasks/{self.task.id}/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        self.task.transition(TaskStatusChoices.DOING)
+        response = self.client.get(f'/tasks/{self.task.id}/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+        assert response.data['status'] == TaskStatusChoices.DOING
+
+    def test_wait_without_since_returns_current_status(self):
+        other = Task.objects.create(runner_path=REGISTRY.registry['add'], username=self.username)
+
+        response = self.client.get(f'/tasks/wait/?id={self.task.id},{other.id}')
+        assert response.status_code == status.HTTP_200_OK
+        assert {t['id'] for t in response.data} == {self.task.id, other.id}
+
+    def test_wait_times_out_without_changes(self):
+        since = (self.task.modified + timedelta(minutes=1)).isoformat()
+
+        started = monotonic()
+        response = self.client.get('/tasks/wait/', {'id': self.task.id, 'since': since, 'timeout': 0.2})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == []
+        assert monotonic() - started >= 0.2
+
+    def test_wait_returns_modified_tasks(self):
+        since = (self.task.modified - timedelta(seconds=1)).isoformat()
+
+        response = self.client.get('/tasks/wait/', {'id': self.task.id, 'since': since, 'timeout': 5})
+        assert [t['id'] for t in response.data] == [self.task.id]
+
+    def test_wait_returns_changes_committed_after_since_again(self):
+        # Modified before `since` but committed after a client saw a later change
+        late = Task.objects.create(runner_path=REGISTRY.registry['add'], username=self.username)
+        since = late.modified + timedelta(seconds=1)
+        Task.objects.filter(id=self.task.id).update(modified=since + timedelta(seconds=1))
+
+        response = self.client.get('/tasks/wait/', {'id': f'{self.task.id},{late.id}', 'since': since.isoformat()})
+        assert {t['id'] for t in response.data} == {self.task.id, late.id}
+
+    def test_sync_wait_is_capped(self):
+        since = (self.task.modified + timedelta(minutes=1)).isoformat()
+
+        started = monotonic()
+        with mock.patch('gonk.contrib.rest_framework.viewsets.SYNC_WAIT_TIMEOUT', 0.1):
+            response = self.client.get('/tasks/wait/', {'id': self.task.id, 'since': since, 'timeout': 30})
+        assert response.data == []
+        assert monotonic() - started < 5
+
+    def test_wait_only_watches_own_tasks(self):
+        other = Task.objects.create(runner_path=REGISTRY.registry['add'], username='vader@starwars.com')
+
+        response = self.client.get('/tasks/wait/', {'id': other.id, 'timeout': 0})
+        assert response.data == []
+
+    def test_await_changes(self):
+        queryset = Task.objects.filter(id=self.task.id)
+
+        assert async_to_sync(await_changes)(queryset, self.task.modified + timedelta(minutes=1), 0.1, 0.05) == []
+
+        self.task.transition(TaskStatusChoices.DONE)
+        changes = async_to_sync(await_changes)(queryset, self.task.modified - timedelta(seconds=1), 1)
+        assert changes[0]['status'] == TaskStatusChoices.DONE
+
+
+class TestBatchStatus(APITestCase, CreateUserMixin):
+    def setUp(self) -> None:
+        self.username = 'kenobi@starwars.com'
+        self.user = self.create_user(self.username, 'ihavethehighground')
+        self.client.force_authenticate(user=self.user)
+        self.tasks = [
+            Task.objects.create(runner_path=REGISTRY.registry['add'], username=self.username, celery_id=f'celery-{i}')
+            for i in range(3)
+        ]
+
+    def test_status_of_many_tasks_in_one_query(self):
+        other = Task.objects.create(runner_path=REGISTRY.registry['add'], username='vader@starwars.com')
+        data = {'ids': [self.tasks[0].id, other.id], 'celery_ids': ['celery-2']}
+
+        with self.assertNumQueries(1):
+            response = self.client.post('/tasks/status/', data=data, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert sorted(t[0] for t in response.data['tasks']) == [self.tasks[0].id, self.tasks[2].id]
+        assert response.data['tasks'][0][1] == TaskStatusChoices.PENDING
+
+    def test_status_modified_since(self):
+        Task.objects.exclude(id=self.tasks[1].id).update(modified=timezone.now() - timedelta(hours=1))
+        data = {'ids': [t.id for t in self.tasks]}
+        response = self.client.post('/tasks/status/', data=data, format='json')
+        assert len(response.data['tasks']) == 3
+
+        self.tasks[1].transition(TaskStatusChoices.DOING, started_on=self.tasks[1].modified)
+        data['modified_since'] = response.data['timestamp']
+        response = self.client.post('/tasks/status/', data=data, format='json')
+
+        assert [t[:2] for t in response.data['tasks']] == [(self.tasks[1].id, TaskStatusChoices.DOING)]
+
+    def test_status_timestamp_covers_changes_that_commit_late(self):
+        data = {'ids': [t.id for t in self.tasks]}
+        response = self.client.post('/tasks/status/', data=data, format='json')
+        latest = max(t.modified for t in self.tasks)
+        assert response.data['timestamp'] == latest - timedelta(seconds=POLL_MARGIN)
+
+        # Modified before the first response but committed after it
+        Task.objects.filter(id=self.tasks[0].id).update(status=TaskStatusChoices.DOING, modified=latest)
+        data['modified_since'] = response.data['timestamp']
+        response = self.client.post('/tasks/status/', data=data, format='json')
+
+        assert (self.tasks[0].id, TaskStatusChoices.DOING) in [tuple(t[:2]) for t in response.data['tasks']]
+
+    def test_status_requires_ids(self):
+        response = self.client.post('/tasks/status/', data={}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,159 @@
+import json
+from unittest import mock
+
+from django.db.models import Q
+from django.test import TestCase
+from django.utils import timezone
+
+from gonk.models import Task
+from gonk.registry import REGISTRY
+from gonk.settings import TaskStatusChoices
+from gonk.snapshots import from_snapshot, get_snapshot
+from gonk.tasks import execute, runner_func, reverter_func, to_retry
+from test_app.taskrunners import AddTaskRunner
+from test_app.tests.mixins import CreateTaskMixin
+
+
+class TestTaskQueryPlans(TestCase):
+    """
+    The hot query paths must be answered by an index instead of a full table scan.
+    """
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, plan)
+
+    def test_cleanup_uses_expire_on_index(self):
+        queryset = Task.objects.filter(expire_on__lte=timezone.now()).order_by()
+        self.assertUsesIndex(queryset, 'gonk_task_expire_on')
+
+    def test_user_list_uses_username_index(self):
+        queryset = Task.objects.filter(username='kenobi@starwars.com').order_by('created')
+        self.assertUsesIndex(queryset, 'gonk_task_username_created')
+
+    def test_runner_type_filter_uses_runner_status_index(self):
+        queryset = Task.objects.filter(runner_path=REGISTRY.registry['add'], status=TaskStatusChoices.DONE)
+        self.assertUsesIndex(queryset.order_by(), 'gonk_task_runner_status')
+
+    def test_list_ordering_uses_created_index(self):
+        queryset = Task.objects.order_by('-created', '-id')
+        self.assertUsesIndex(queryset, 'gonk_task_created')
+
+    def test_dashboard_filter_uses_status_queue_index(self):
+        queryset = Task.objects.filter(Q(status=TaskStatusChoices.DOING) & Q(queue='celery'))
+        self.assertUsesIndex(queryset, 'gonk_task_status_queue')
+
+    def test_dead_letters_use_dead_letter_index(self):
+        self.assertUsesIndex(Task.objects.dead_letters(), 'gonk_task_dead_letter')
+
+    def test_stale_tasks_use_heartbeat_index(self):
+        self.assertUsesIndex(Task.objects.stale(60), 'gonk_task_heartbeat')
+
+
+class TestTaskLifecycleQueries(TestCase, CreateTaskMixin):
+    """
+    Number of queries issued by the worker for every task lifecycle.
+    """
+
+    def test_run_lifecycle(self):
+        task = self.create_task()
+
+        # SELECT, UPDATE to DOING, INSERT log entries, UPDATE to DONE
+        with self.assertNumQueries(4):
+            execute(task.id, runner_func)
+
+        task.refresh_from_db()
+        assert task.status == TaskStatusChoices.DONE
+        assert task.results == {'solution': 3}
+
+    def test_error_lifecycle(self):
+        task = self.create_task(input={'element1': 'one', 'element2': 2})
+
+        # SELECT, UPDATE to DOING, INSERT log entries, UPDATE to ERROR, INSERT log entries
+        with self.assertNumQueries(5):
+            execute(task.id, runner_func)
+
+        task.refresh_from_db()
+        assert task.status == TaskStatusChoices.ERROR
+        assert 'exception' in task.results
+
+    def test_retry_lifecycle(self):
+        task = self.create_task(retryable=True)
+
+        # SELECT, UPDATE to DOING, INSERT log entries, UPDATE to ERROR with the next celery_id,
+        # INSERT log entries, INSERT attempt
+        with mock.patch.object(AddTaskRunner, 'run', side_effect=ValueError('boom')), \
+                mock.patch.object(to_retry, 'apply_async') as apply_async:
+            with self.assertNumQueries(6), self.captureOnCommitCallbacks(execute=True):
+                execute(task.id, runner_func)
+
+        task.refresh_from_db()
+        assert task.status == TaskStatusChoices.ERROR
+        assert apply_async.call_args.kwargs['task_id'] == task.celery_id
+
+    def test_revert_lifecycle(self):
+        task = self.create_task(input={}, status=TaskStatusChoices.TO_REVERT, results={'solution': 3})
+
+        with self.assertNumQueries(4):
+            execute(task.id, reverter_func)
+
+        task.refresh_from_db()
+        assert task.status == TaskStatusChoices.REVERTED
+        assert task.results == {}
+
+    def test_canceled_task_is_not_run(self):
+        task = self.create_task(status=TaskStatusChoices.CANCELED)
+
+        with self.assertNumQueries(2):
+            execute(task.id, runner_func)
+
+        task.refresh_from_db()
+        assert task.status == TaskStatusChoices.CANCELED
+        assert task.results == {}
+
+    def test_finished_task_is_not_overwritten_by_a_concurrent_cancel(self):
+        task = self.create_task()
+
+        def cancel_while_running(runner):
+            Task.objects.filter(id=task.id).update(status=TaskStatusChoices.CANCELED)
+
+        with mock.patch.object(AddTaskRunner, 'run', autospec=True, side_effect=cancel_while_running):
+            execute(task.id, runner_func)
+
+        task.refresh_from_db()
+        assert task.status == TaskStatusChoices.CANCELED
+
+    def test_run_lifecycle_from_snapshot(self):
+        task = self.create_task()
+
+        with mock.patch('gonk.models.TASK_SNAPSHOT', True):
+            kwargs = json.loads(json.dumps(task.get_run_kwargs()))
+
+        # UPDATE to DOING, INSERT log entries, UPDATE to DONE
+        with self.assertNumQueries(3):
+            execute(**kwargs, func=runner_func)
+
+        task.refresh_from_db()
+        assert task.status == TaskStatusChoices.DONE
+        assert task.results == {'solution': 3}
+
+    def test_snapshot_defers_missing_fields(self):
+        task = self.create_task(log='legacy')
+        snapshot = from_snapshot(task.id, json.loads(json.dumps(get_snapshot(task))))
+
+        assert snapshot.get_deferred_fields() == {'log', 'started_on', 'finished_on', 'revert_started_on',
+                                                  'revert_finished_on', 'expire_on', 'modified', 'created',
+                                                  'dedupe_key', 'input_hash', 'dispatched_on', 'heartbeat',
+                                                  'pending_children'}
+        with self.assertNumQueries(1):
+            assert snapshot.log == 'legacy'
+
+    def test_snapshot_of_a_deleted_task_is_not_run(self):
+        task = self.create_task()
+        snapshot = get_snapshot(task)
+        task_id = task.id
+        task.delete()
+
+        with mock.patch.object(AddTaskRunner, 'run') as run:
+            execute(task_id, runner_func, snapshot=snapshot)
+
+        run.assert_not_called()
@@ -0,0 +1,37 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from gonk.models import Task
+from gonk.registry import REGISTRY, TaskRegistry
+from gonk.taskrunners import TaskRunner
+from test_app.taskrunners import AddTaskRunner
+
+
+class TestTaskRegistry(TestCase):
+    def test_registered_taskrunners_are_resolved_without_importing(self):
+        runner_path = REGISTRY.registry['add']
+
+        with mock.patch('gonk.registry.import_string') as import_string:
+            assert REGISTRY.get_taskrunner_class(runner_path) is AddTaskRunner
+            assert REGISTRY.taskrunners['add'] is AddTaskRunner
+
+        import_string.assert_not_called()
+
+    def test_unregistered_runner_paths_are_imported_once(self):
+        registry = TaskRegistry()
+
+        with mock.patch('gonk.registry.import_string', return_value=TaskRunner) as import_string:
+            for _ in range(3):
+                assert registry.get_taskrunner_class('gonk.taskrunners.TaskRunner') is TaskRunner
+
+        import_string.assert_called_once_with('gonk.taskrunners.TaskRunner')
+
+    def test_checkpoints_resolve_the_taskrunner_once_per_task(self):
+        task = Task.objects.create(runner_path=REGISTRY.registry['add'])
+
+        with mock.patch.object(REGISTRY, 'get_taskrunner_class', wraps=REGISTRY.get_taskrunner_class) as resolve:
+            for i in range(200):
+                task.log_status(f'checkpoint {i}', checkpoint=True)
+
+        resolve.assert_called_once_with(task.runner_path)
@@ -0,0 +1,168 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from gonk import backoff
+from gonk.models import Task, TaskAttempt, TaskLogEntry
+from gonk.registry import REGISTRY
+from gonk.settings import RetryBackoffChoices, TaskStatusChoices
+from gonk.tasks import execute, retry_func, runner_func, to_retry
+from test_app.taskrunners import AddTaskRunner
+from test_app.tests.mixins import CreateTaskMixin
+
+
+class TestBackoff(TestCase):
+    def test_fixed(self):
+        assert backoff.get_delay(RetryBackoffChoices.FIXED, timedelta(seconds=5), 4, timedelta(hours=1)) == \
+            timedelta(seconds=5)
+
+    def test_exponential_is_capped(self):
+        delays = [
+            backoff.get_delay(RetryBackoffChoices.EXPONENTIAL, timedelta(seconds=5), retries, timedelta(seconds=30))
+            for retries in range(4)
+        ]
+        assert delays == [timedelta(seconds=5), timedelta(seconds=10), timedelta(seconds=20), timedelta(seconds=30)]
+
+    def test_decorrelated_jitter(self):
+        base = timedelta(seconds=5)
+
+        for _ in range(50):
+            delay = backoff.get_delay(RetryBackoffChoices.JITTER, base, 1, timedelta(hours=1), timedelta(seconds=20))
+            assert base <= delay <= timedelta(seconds=60)
+
+        delay = backoff.get_delay(RetryBackoffChoices.JITTER, base, 1, timedelta(seconds=7), timedelta(seconds=20))
+        assert delay <= timedelta(seconds=7)
+
+
+class TestTaskRetries(TestCase, CreateTaskMixin):
+    task_defaults = {
+        'input': {'element1': 'one', 'element2': 2},
+        'retryable': True,
+        'retry_time': timedelta(seconds=10),
+    }
+
+    def fail(self, task: Task):
+        with mock.patch.object(to_retry, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                execute(task.id, runner_func)
+
+        return apply_async
+
+    def test_task_backoff_overrides_runner(self):
+        task = self.create_task(retries=2, retry_backoff=RetryBackoffChoices.EXPONENTIAL)
+
+        assert task.get_retry_delay() == timedelta(seconds=40)
+
+        with mock.patch.object(AddTaskRunner, 'retry_backoff', RetryBackoffChoices.EXPONENTIAL):
+            task.retry_backoff = ''
+            assert task.get_retry_delay() == timedelta(seconds=40)
+
+    def test_failed_attempts_are_recorded(self):
+        task = self.create_task()
+
+        started = timezone.now()
+        apply_async = self.fail(task)
+
+        attempt = TaskAttempt.objects.get(task=task)
+        assert attempt.number == 1
+        assert attempt.status == TaskStatusChoices.ERROR
+        assert attempt.started_on >= started
+        assert attempt.retry_delay == timedelta(seconds=10)
+        assert attempt.error
+        assert apply_async.call_args.kwargs['eta'] >= started + timedelta(seconds=10)
+
+    def test_done_attempts_are_recorded(self):
+        task = self.create_task()
+        Task.objects.filter(id=task.id).update(input={'element1': 1, 'element2': 2})
+
+        execute(task.id, runner_func)
+
+        assert TaskAttempt.objects.get(task=task).status == TaskStatusChoices.DONE
+
+    def test_non_retryable_tasks_keep_no_history(self):
+        task = self.create_task()
+        Task.objects.filter(id=task.id).update(retryable=False)
+
+        self.fail(task)
+
+        assert not TaskAttempt.objects.exists()
+
+    def test_retry_saves_a_new_celery_id(self):
+        task = self.create_task(status=TaskStatusChoices.ERROR)
+        previous = task.celery_id
+
+        with mock.patch.object(to_retry, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                task.retry()
+
+        assert task.celery_id != previous
+        assert Task.objects.get(id=task.id).celery_id == task.celery_id
+        assert apply_async.call_args.kwargs['task_id'] == task.celery_id
+
+    def test_jitter_uses_the_previous_delay(self):
+        task = self.create_task(retries=1, retry_backoff=RetryBackoffChoices.JITTER)
+        TaskAttempt.objects.create(task=task, runner_path=task.runner_path, number=1,
+                                   status=TaskStatusChoices.ERROR, retry_delay=timedelta(seconds=100))
+
+        with mock.patch('gonk.backoff.random.uniform', return_value=150) as uniform:
+            assert task.get_retry_delay() == timedelta(seconds=150)
+
+        uniform.assert_called_once_with(10, 300)
+
+    def test_exhausted_retry_budget_pauses_retries(self):
+        task = self.create_task()
+        TaskAttempt.objects.bulk_create(
+            TaskAttempt(task=task, runner_path=task.runner_path, number=1, status=TaskStatusChoices.ERROR)
+            for _ in range(10)
+        )
+
+        with mock.patch.object(AddTaskRunner, 'retry_budget', 0.5):
+            with self.assertNumQueries(1):
+                assert task.get_retry_delay() == timedelta(minutes=1)
+
+        with mock.patch.object(AddTaskRunner, 'retry_budget', 0.5), \
+                mock.patch.object(AddTaskRunner, 'retry_budget_min_attempts', 20):
+            assert task.get_retry_delay() == timedelta(seconds=10)
+
+    def test_paused_retry_is_logged(self):
+        task = self.create_task()
+        TaskAttempt.objects.bulk_create(
+            TaskAttempt(task=task, runner_path=task.runner_path, number=1, status=TaskStatusChoices.ERROR)
+            for _ in range(10)
+        )
+
+        with mock.patch.object(AddTaskRunner, 'retry_budget', 0.5):
+            apply_async = self.fail(task)
+
+        assert TaskLogEntry.objects.filter(task=task, message='RETRY BUDGET EXHAUSTED, RETRY PAUSED').exists()
+        assert apply_async.call_args.kwargs['eta'] >= timezone.now() + timedelta(seconds=50)
+
+
+class TestRetryAccounting(TestCase):
+    def test_retries_are_exhausted_after_max_retries(self):
+        task = Task.objects.create(runner_path=REGISTRY.registry['add'], input={'element1': 'one', 'element2': 2},
+                                   retryable=True, max_retries=2)
+
+        with mock.patch.object(to_retry, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                execute(task.id, runner_func)
+                execute(task.id, retry_func)
+                execute(task.id, retry_func)
+
+        task.refresh_from_db()
+        assert apply_async.call_count == 2
+        assert task.status == TaskStatusChoices.RETRY_ERROR
+        assert task.retries == 2
+        # The last failure schedules nothing, so the task keeps the id of its last attempt
+        assert task.celery_id == apply_async.call_args.kwargs['task_id']
+        assert list(task.attempts.values_list('number', flat=True)) == [1, 2, 3]
+        assert all(attempt.duration >= timedelta(0) for attempt in task.attempts.all())
+        assert list(Task.objects.dead_letters()) == [task]
+
+    def test_create_task_defaults_to_model_max_retries(self):
+        with mock.patch('gonk.tasks.to_run.apply_async'):
+            task = Task.create_task('add', {'element1': 1, 'element2': 2})
+
+        assert task.max_retries == Task._meta.get_field('max_retries').default
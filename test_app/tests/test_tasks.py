@@ -274,3 +274,95 @@ class TestCreateTask(APITestCase, CreateUserMixin):
         self.assertEqual(Task.objects.filter(id=task_id).first(), None)
         self.assertEqual(open('created_on_expire', 'r').read(), 'hello')
         os.remove("created_on_expire")
+
+    def test_create_tasks_in_bulk(self):
+        self.add_permission(self.user, 'can_create_task')
+        self.client.force_authenticate(user=self.user)
+
+        data = [
+            {
+                'task_type': 'add',
+                'task_input': {
+                    'element1': i,
+                    'element2': 3,
+                }
+            } for i in range(5)
+        ]
+
+        response = self.client.post('/tasks/', data=json.dumps(data), content_type='application/json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(response.data) == 5
+
+        tasks = Task.objects.filter(username=self.username)
+        assert tasks.count() == 5
+        assert all(task.celery_id for task in tasks)
+
+    def test_create_tasks_in_bulk_with_taskrunner_validation_error(self):
+        self.add_permission(self.user, 'can_create_task')
+        self.client.force_authenticate(user=self.user)
+
+        data = [
+            {'task_type': 'add', 'task_input': {'element1': 1, 'element2': 1}},
+            {'task_type': 'add', 'task_input': {'element1': 1, 'element2': -1}},
+        ]
+
+        response = self.client.post('/tasks/', data=json.dumps(data), content_type='application/json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert Task.objects.count() == 0
+
+    def test_create_tasks_from_ndjson_command(self):
+        import io
+        from django.core.management import call_command
+
+        ndjson = io.StringIO('\n'.join(json.dumps({'element1': i, 'element2': 1}) for i in range(3)) + '\n')
+        out = io.StringIO()
+        call_command('create_task', 'add', ndjson=ndjson, stdout=out)
+
+        assert Task.objects.count() == 3
+        assert 'Created 3 tasks' in out.getvalue()
+
+    def test_create_task_dispatches_on_commit_with_preassigned_celery_id(self):
+        from unittest import mock
+        from gonk.tasks import to_run
+
+        with mock.patch.object(to_run, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                with self.assertNumQueries(1):
+                    task = Task.create_task('add', {'element1': 1, 'element2': 2})
+                apply_async.assert_not_called()
+
+        assert len(callbacks) == 1
+        apply_async.assert_called_once()
+        assert apply_async.call_args.kwargs['task_id'] == task.celery_id
+        assert Task.objects.get(id=task.id).celery_id == task.celery_id
+
+    def test_create_tasks_in_bulk_dispatches_preassigned_celery_ids(self):
+        from unittest import mock
+        from celery.canvas import group
+
+        with mock.patch.object(group, 'apply_async', autospec=True) as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                tasks = Task.create_tasks(
+                    {'task_type': 'add', 'task_input': {'element1': i, 'element2': 2}} for i in range(3)
+                )
+
+        signatures = apply_async.call_args.args[0].tasks
+        assert [s.options['task_id'] for s in signatures] == [t.celery_id for t in tasks]
+        assert [s.kwargs['task_id'] for s in signatures] == [t.id for t in tasks]
+
+    def test_create_tasks_in_bulk_reads_back_ids_when_the_backend_does_not_return_them(self):
+        from unittest import mock
+        from celery.canvas import group
+        from django.db import connection
+
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False), \
+                mock.patch.object(group, 'apply_async', autospec=True) as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                tasks = Task.create_tasks(
+                    {'task_type': 'add', 'task_input': {'element1': i, 'element2': 2}} for i in range(3)
+                )
+
+        signatures = apply_async.call_args.args[0].tasks
+        assert all(t.id is not None for t in tasks)
+        assert [t.id for t in tasks] == list(Task.objects.order_by('id').values_list('id', flat=True))
+        assert [s.kwargs['task_id'] for s in signatures] == [t.id for t in tasks]
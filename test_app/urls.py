@@ -2,4 +2,5 @@ from django.urls import path, include
 
 urlpatterns = [
     path('tasks/', include('gonk.contrib.rest_framework.urls')),
+    path('async/tasks/', include('gonk.contrib.rest_framework.async_urls')),
 ]